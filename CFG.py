@@ -0,0 +1,291 @@
+# context free grammars
+# a grammar file uses the same [Section] ... End layout and comments as a .pda file:
+#     [Variables]   - the variables (nonterminals), one per line
+#     [Terminals]   - the terminals (the input alphabet), one per line
+#     [Rules]       - productions written as  head -> body | body | ...
+#                     with the symbols of a body separated by spaces, and epsilon (or ε) for an empty body
+#     [Start]       - the start variable
+# parseGrammarFile reads it, grammarToPDA turns it into the same structure parseFile returns, and
+# EarleyRecognizer decides membership with a chart parser - polynomial time, however nondeterministic the
+# equivalent PDA is - so both engines can be cross-checked on the same inputs (crossCheck)
+import PDA as automaton
+import NPDA as nondeterministic
+import itertools
+
+class GrammarError(automaton.PDAError):
+    # base class of the errors found in a grammar definition
+    pass
+
+class UndefinedStartVariableError(GrammarError):
+    # raised when the grammar doesn't have a start variable, or it isn't one of its variables
+    pass
+
+class InvalidGrammarSymbolError(GrammarError):
+    # raised when a production uses a symbol that is neither a variable nor a terminal, or a symbol is both
+    pass
+
+class InvalidProductionError(GrammarError):
+    # raised when a line in the [Rules] section isn't written as head -> body | body | ...
+    pass
+
+def parseGrammarFile(inputGrammarFile):
+    currentSection = "None"
+    variables = []
+    terminals = []
+    productions = {} # productions[head] = list of bodies, every body a tuple of symbols (empty for epsilon)
+    start = "None"
+    for lineNumber, column, line in automaton.scanDefinition(inputGrammarFile):
+        if line[0] == "[":
+            currentSection = line[1:-1]
+            continue
+        if line == "End":
+            currentSection = "None"
+            continue
+
+        if currentSection == "Variables":
+            variables.append(line)
+        elif currentSection == "Terminals":
+            terminals.append(line)
+        elif currentSection == "Start":
+            start = line
+        elif currentSection == "Rules":
+            head, arrow, bodies = line.partition("->")
+            head = head.strip()
+            if not arrow or not head:
+                raise InvalidProductionError(f"line {lineNumber}, column {column}: production {line} should be written as head -> body | body | ...")
+            for body in bodies.split("|"):
+                symbols = tuple(symbol for symbol in body.split() if not automaton.isEpsilon(symbol))
+                productions.setdefault(head, [])
+                if symbols not in productions[head]:
+                    productions[head].append(symbols)
+    inputGrammarFile.close()
+
+    grammar = variables, terminals, productions, start
+    isGrammarValid(grammar)
+    return grammar
+
+def isGrammarValid(grammar):
+    variables, terminals, productions, start = grammar
+    variables = set(variables)
+    terminals = set(terminals)
+    if len(terminals) == 0:
+        raise automaton.UndefinedAlphabetError("Terminals are not defined")
+    if start == "None" or start not in variables:
+        raise UndefinedStartVariableError(f"Start variable {start} is not defined")
+    for symbol in variables & terminals:
+        raise InvalidGrammarSymbolError(f"Symbol {symbol} is both a variable and a terminal")
+    for head in productions:
+        if head not in variables:
+            raise InvalidGrammarSymbolError(f"Production head {head} is not defined in the variables of the grammar")
+        for body in productions[head]:
+            for symbol in body:
+                if symbol not in variables and symbol not in terminals:
+                    raise InvalidGrammarSymbolError(f"Symbol {symbol} in a production of {head} is neither a variable nor a terminal")
+    return True
+
+def nullableVariables(grammar):
+    # the variables that derive the empty string
+    variables, terminals, productions, start = grammar
+    nullable = set()
+    changed = True
+    while changed:
+        changed = False
+        for head in productions:
+            if head not in nullable and any(all(symbol in nullable for symbol in body) for body in productions[head]):
+                nullable.add(head)
+                changed = True
+    return nullable
+
+def removeEpsilonProductions(grammar):
+    # an equivalent grammar without epsilon productions (it generates the same strings, except the empty
+    # string): every body gets a variant for every way of leaving out its nullable variables, and the empty
+    # bodies are dropped
+    variables, terminals, productions, start = grammar
+    nullable = nullableVariables(grammar)
+    epsilonFreeProductions = {}
+    for head in productions:
+        bodies = []
+        for body in productions[head]:
+            choices = [((symbol,), ()) if symbol in nullable else ((symbol,),) for symbol in body]
+            for variant in itertools.product(*choices):
+                variantBody = tuple(symbol for part in variant for symbol in part)
+                if variantBody and variantBody not in bodies:
+                    bodies.append(variantBody)
+        epsilonFreeProductions[head] = bodies
+    return variables, terminals, epsilonFreeProductions, start
+
+def uniqueName(name, usedNames):
+    # name, with ' appended until it isn't one of usedNames
+    while name in usedNames:
+        name += "'"
+    return name
+
+def grammarToPDA(grammar):
+    # the usual construction of a PDA that accepts the language of the grammar:
+    # the start variable is pushed above a bottom marker, then in the loop state a variable on top of the
+    # stack is replaced by one of its production bodies (epsilon move), and a terminal on top of the stack
+    # is matched against the input symbol. When only the bottom marker is left, the PDA moves to the accept state.
+    # a body is pushed in one move, as a push string (see automaton.splitPush) - its first symbol ends on
+    # top. Several productions of the same variable are several rules with the same source state, symbol
+    # and pop symbol, so the result is meant for the nondeterministic engine (NPDA.py)
+    variables, terminals, productions, start = grammar
+    usedNames = set(variables) | set(terminals)
+    bottom = uniqueName("$", usedNames)
+    startState = uniqueName("qStart", usedNames)
+    pushStartState = uniqueName("qPushStart", usedNames)
+    loopState = uniqueName("qLoop", usedNames)
+    acceptState = uniqueName("qAccept", usedNames)
+    states = [startState, pushStartState, loopState, acceptState]
+
+    ruleList = [(startState, "epsilon", "epsilon", bottom, pushStartState),
+                (pushStartState, "epsilon", "epsilon", start, loopState)]
+    for head in productions:
+        for body in productions[head]:
+            ruleList.append((loopState, "epsilon", head, " ".join(body) or "epsilon", loopState))
+    for terminal in terminals:
+        ruleList.append((loopState, terminal, terminal, "epsilon", loopState))
+    ruleList.append((loopState, "epsilon", bottom, "epsilon", acceptState))
+
+    rules = {}
+    for sourceState, symbol, popSymbol, pushSymbol, destinationState in ruleList:
+        rules.setdefault(sourceState, {}).setdefault(symbol, {})[popSymbol] = {
+            "push" : pushSymbol,
+            "nextState" : destinationState
+        }
+    PDA = states, list(terminals), list(variables) + list(terminals) + [bottom], rules, startState, [acceptState]
+    if not automaton.isPDAValid(PDA, ruleList):
+        raise automaton.PDAError("PDA not valid")
+    return automaton.ValidatedPDA(PDA, ruleList)
+
+class EarleyRecognizer:
+    # Earley chart parser deciding if a string of terminals is generated by the grammar, in O(n³) time for
+    # any grammar (O(n²) for unambiguous ones), epsilon productions included
+    # an item is (production, dot, origin): production number, how many body symbols were matched, and
+    # the chart column the match started in. Nullable variables are skipped over when they are predicted,
+    # so completing an empty match never has to look back into the column being built.
+    # the predictions of column 0 don't depend on the input, so they are computed once, and the results of
+    # strings already checked are memoized (up to cacheSize of them)
+    __slots__ = ("terminals", "heads", "bodies", "productionsOf", "nullable", "firstColumn", "cache", "cacheSize")
+
+    def __init__(self, grammar, cacheSize = 100000):
+        variables, terminals, productions, start = grammar
+        isGrammarValid(grammar)
+        self.terminals = frozenset(terminals)
+        # production 0 is an extra start production, its head None can't clash with a variable
+        self.heads = [None]
+        self.bodies = [(start,)]
+        self.productionsOf = {variable : [] for variable in variables}
+        for head in productions:
+            for body in productions[head]:
+                self.productionsOf[head].append(len(self.heads))
+                self.heads.append(head)
+                self.bodies.append(body)
+
+        self.nullable = set()
+        changed = True
+        while changed:
+            changed = False
+            for head, body in zip(self.heads, self.bodies):
+                if head is not None and head not in self.nullable and all(symbol in self.nullable for symbol in body):
+                    self.nullable.add(head)
+                    changed = True
+
+        self.firstColumn = self.buildColumn([(0, 0, 0)], 0, [])
+        self.cache = {}
+        self.cacheSize = cacheSize
+
+    def buildColumn(self, items, column, chart):
+        # closes a chart column under prediction and completion, starting from the given items
+        # chart[origin] is the dict variable -> items waiting for that variable in column origin
+        # returns (items of the column, dict variable -> items of the column waiting for that variable)
+        bodies = self.bodies
+        productionsOf = self.productionsOf
+        nullable = self.nullable
+        seen = set(items)
+        toVisit = list(items)
+        waiting = {}
+        while toVisit:
+            item = toVisit.pop()
+            production, dot, origin = item
+            body = bodies[production]
+            newItems = []
+            if dot < len(body):
+                symbol = body[dot]
+                if symbol in productionsOf: # a variable - predict its productions
+                    waiting.setdefault(symbol, []).append(item)
+                    newItems = [(predicted, 0, column) for predicted in productionsOf[symbol]]
+                    if symbol in nullable:
+                        newItems.append((production, dot + 1, origin))
+            elif origin != column: # complete - advance the items waiting for this variable where it started
+                head = self.heads[production]
+                newItems = [(waitingProduction, waitingDot + 1, waitingOrigin)
+                            for waitingProduction, waitingDot, waitingOrigin in chart[origin].get(head, ())]
+            for newItem in newItems:
+                if newItem not in seen:
+                    seen.add(newItem)
+                    toVisit.append(newItem)
+        return seen, waiting
+
+    def accepts(self, symbols):
+        # symbols - sequence of terminals
+        symbols = tuple(symbols)
+        if symbols in self.cache:
+            return self.cache[symbols]
+        for symbol in symbols:
+            if symbol not in self.terminals:
+                raise automaton.InputStringError("Input string contains symbols not in the given alphabet of the PDA")
+
+        items, waiting = self.firstColumn
+        chart = [waiting]
+        for column, symbol in enumerate(symbols, start = 1):
+            scanned = [(production, dot + 1, origin) for production, dot, origin in items
+                       if dot < len(self.bodies[production]) and self.bodies[production][dot] == symbol]
+            if not scanned:
+                accepted = False
+                break
+            items, waiting = self.buildColumn(scanned, column, chart)
+            chart.append(waiting)
+        else:
+            accepted = (0, 1, 0) in items
+
+        if len(self.cache) >= self.cacheSize:
+            self.cache.clear()
+        self.cache[symbols] = accepted
+        return accepted
+
+def runGrammar(grammar, inputString, stringSeparator):
+    # counterpart of runPDA for a grammar (or an EarleyRecognizer built from one)
+    if isinstance(grammar, EarleyRecognizer):
+        recognizer = grammar
+    else:
+        recognizer = EarleyRecognizer(grammar)
+    return recognizer.accepts(automaton.splitIncludingNoSeparator(inputString.strip(), stringSeparator))
+
+def crossCheck(grammar, inputStrings, stringSeparator):
+    # runs every input string through the Earley recognizer and through the nondeterministic engine on
+    # the PDA built by grammarToPDA, and returns the (inputString, earleyResult, PDAResult) triples they
+    # disagree on - an empty list means both engines agree
+    # the PDA is built from the grammar without its epsilon productions (removeEpsilonProductions), and the
+    # empty string is checked against the nullable variables instead. Without nullable variables every
+    # symbol above the bottom marker has to match at least one input symbol, so the epsilon moves expanding
+    # variables only need to grow the stack by about the length of the input string - with them, the
+    # stacks explored grow exponentially with that limit
+    # the nondeterministic engine can still take exponential time on left recursive grammars - it is the
+    # reference to check the recognizer against, not the fast path
+    recognizer = EarleyRecognizer(grammar)
+    epsilonFreeGrammar = removeEpsilonProductions(grammar)
+    acceptsEmptyString = grammar[3] in nullableVariables(grammar)
+    machine = nondeterministic.compileNPDA(grammarToPDA(epsilonFreeGrammar))
+    longestBody = max((len(body) for bodies in epsilonFreeGrammar[2].values() for body in bodies), default = 1)
+    disagreements = []
+    for inputString in inputStrings:
+        symbols = automaton.splitIncludingNoSeparator(inputString.strip(), stringSeparator)
+        earleyResult = recognizer.accepts(symbols)
+        if len(symbols) == 0:
+            PDAResult = acceptsEmptyString
+        else:
+            PDAResult = nondeterministic.runNPDA(machine, inputString, stringSeparator,
+                                                 epsilonGrowthLimit = len(symbols) + longestBody + 1)
+        if earleyResult != PDAResult:
+            disagreements.append((inputString, earleyResult, PDAResult))
+    return disagreements
@@ -0,0 +1,164 @@
+# nondeterministic simulation of a push down automaton
+# runPDA follows a single branch: the rules dict keeps one rule per (state, symbol, pop symbol) and a state
+# with no matching rule stays where it is. This module explores every branch of the transition function
+#     δ : Q × (Σ ∪ {ε}) × (Γ ∪ {ε}) → P(Q × (Γ ∪ {ε}))
+# by keeping the set of all (state, stack) configurations the PDA can be in after every input symbol.
+# It uses the usual nondeterministic semantics: a configuration with no matching rule has no successor
+# (its branch dies), and the input is accepted if any configuration is in an accept state once the input
+# is consumed and the epsilon moves are followed.
+import PDA as automaton
+
+class NondeterministicPDA:
+    # the rules of a PDA, grouped for the configuration-set engine
+    # states, input symbols and stack symbols are interned as small ints like in CompiledPDA, and
+    # moves[state][symbol] is the list of (popSymbol, pushSymbols, nextState) alternatives for that state
+    # and symbol (symbol numSymbols stands for epsilon, popSymbol NO_RULE for epsilon, pushSymbols the
+    # tuple of stack symbols pushed, bottom first - see automaton.splitPush)
+    __slots__ = ("stateNames", "stateIndex", "symbolNames", "symbolIndex", "stackNames", "stackIndex",
+                 "numSymbols", "start", "acceptMask", "moves", "longestPush")
+
+def compileNPDA(PDA):
+    PDA = automaton.freezePDA(PDA)
+    states, sigma, stackSigma, rules, start, accept = PDA
+
+    machine = NondeterministicPDA()
+    machine.stateNames, machine.stateIndex = automaton.internNames(states)
+    machine.symbolNames, machine.symbolIndex = automaton.internNames(sigma)
+    machine.stackNames, machine.stackIndex = automaton.internNames(stackSigma)
+    machine.numSymbols = len(machine.symbolNames)
+    machine.start = machine.stateIndex[start]
+    machine.acceptMask = bytearray(len(machine.stateNames))
+    for acceptState in accept:
+        machine.acceptMask[machine.stateIndex[acceptState]] = 1
+
+    machine.moves = [[[] for symbol in range(machine.numSymbols + 1)] for state in machine.stateNames]
+    machine.longestPush = 1 # most stack symbols a rule pushes
+    for sourceState, symbol, popSymbol, pushSymbol, destinationState in automaton.getRuleList(PDA):
+        if symbol in ["epsilon", "ε"]:
+            symbolCode = machine.numSymbols
+        else:
+            symbolCode = machine.symbolIndex[symbol]
+        popCode = automaton.NO_RULE if popSymbol in ["epsilon", "ε"] else machine.stackIndex[popSymbol]
+        pushCodes = tuple(machine.stackIndex[symbol] for symbol in automaton.splitPush(pushSymbol))
+        machine.longestPush = max(machine.longestPush, len(pushCodes))
+        move = (popCode, pushCodes, machine.stateIndex[destinationState])
+        alternatives = machine.moves[machine.stateIndex[sourceState]][symbolCode]
+        if move not in alternatives: # the same rule written twice is still a single branch
+            alternatives.append(move)
+    return machine
+
+class StackGraph:
+    # graph-structured stack shared by all the configurations of a run
+    # a stack is a node (top, rest, height), the empty stack is None, and nodes are interned: pushing the
+    # same symbol on the same stack always gives the same node object. Identical stacks are therefore the
+    # same object, configurations can be compared by identity, and branches share their common suffixes
+    # instead of copying whole stacks.
+    # the intern table keeps every node alive until the run ends, so ids are never reused
+    __slots__ = ("nodes",)
+
+    def __init__(self):
+        self.nodes = {}
+
+    def push(self, symbol, node):
+        key = (symbol, id(node))
+        pushed = self.nodes.get(key)
+        if pushed is None:
+            pushed = (symbol, node, 1 if node is None else node[2] + 1)
+            self.nodes[key] = pushed
+        return pushed
+
+def height(node):
+    return 0 if node is None else node[2]
+
+def applyMove(move, node, stackGraph):
+    # the stack after a move, or False if the move doesn't apply (its pop symbol isn't on top)
+    popSymbol, pushSymbols, nextState = move
+    if popSymbol != automaton.NO_RULE:
+        if node is None or node[0] != popSymbol:
+            return False
+        node = node[1]
+    for pushSymbol in pushSymbols:
+        node = stackGraph.push(pushSymbol, node)
+    return node
+
+def epsilonClosure(machine, configurations, stackGraph, epsilonGrowthLimit):
+    # adds to configurations (a dict (state, id(stack)) -> (state, stack)) every configuration reachable from
+    # them through epsilon moves
+    # epsilon cycles that grow the stack (like Entrance, epsilon, epsilon, $, Entrance) would produce
+    # infinitely many configurations, so a path of epsilon moves may grow the stack by at most
+    # epsilonGrowthLimit symbols above the height of the configuration it started from - the cycle is
+    # followed as many times as fits under that height, and no further
+    # a configuration is explored once, and again only if it is reached with a higher height limit than
+    # before (it can reach more from there) - so the result doesn't depend on the order the rules are tried
+    # in, and a configuration isn't explored again for every path leading to it
+    epsilon = machine.numSymbols
+    toVisit = []
+    maximumHeights = {} # (state, id(stack)) -> highest height limit the configuration was explored with
+    for key, (state, node) in configurations.items():
+        maximumHeights[key] = height(node) + epsilonGrowthLimit
+        toVisit.append((state, node, maximumHeights[key]))
+    while toVisit:
+        state, node, maximumHeight = toVisit.pop()
+        if maximumHeights[(state, id(node))] > maximumHeight:
+            continue # explored again with a higher limit since it was queued
+        for move in machine.moves[state][epsilon]:
+            nextNode = applyMove(move, node, stackGraph)
+            if nextNode is False or height(nextNode) > maximumHeight:
+                continue
+            nextKey = (move[2], id(nextNode))
+            if maximumHeights.get(nextKey, -1) >= maximumHeight:
+                continue
+            maximumHeights[nextKey] = maximumHeight
+            configurations[nextKey] = (move[2], nextNode)
+            toVisit.append((move[2], nextNode, maximumHeight))
+    return configurations
+
+def runNPDA(PDA, inputString, stringSeparator, printPDASteps = False, epsilonGrowthLimit = None):
+    # nondeterministic counterpart of runPDA - True if any branch of the PDA accepts the input string
+    # epsilonGrowthLimit bounds how far epsilon moves may grow a stack between two input symbols (see
+    # epsilonClosure), by default the number of states times the longest push string, enough to go once
+    # around any epsilon cycle
+    if isinstance(PDA, NondeterministicPDA):
+        machine = PDA
+    else:
+        machine = compileNPDA(PDA)
+    if epsilonGrowthLimit is None:
+        epsilonGrowthLimit = len(machine.stateNames) * machine.longestPush
+
+    symbolIndex = machine.symbolIndex
+    inputString = inputString.strip()
+    try:
+        symbols = [symbolIndex[symbol] for symbol in automaton.splitIncludingNoSeparator(inputString, stringSeparator)]
+    except KeyError:
+        raise automaton.InputStringError("Input string contains symbols not in the given alphabet of the PDA")
+
+    stackGraph = StackGraph()
+    configurations = {(machine.start, id(None)): (machine.start, None)}
+    configurations = epsilonClosure(machine, configurations, stackGraph, epsilonGrowthLimit)
+    if printPDASteps == True:
+        printConfigurations(machine, configurations)
+
+    for currentSymbol in symbols:
+        if printPDASteps == True:
+            print(machine.symbolNames[currentSymbol])
+        nextConfigurations = {}
+        for state, node in configurations.values():
+            for move in machine.moves[state][currentSymbol]:
+                nextNode = applyMove(move, node, stackGraph)
+                if nextNode is not False:
+                    nextConfigurations[(move[2], id(nextNode))] = (move[2], nextNode)
+        configurations = epsilonClosure(machine, nextConfigurations, stackGraph, epsilonGrowthLimit)
+        if printPDASteps == True:
+            printConfigurations(machine, configurations)
+        if not configurations:
+            return False # every branch died, the rest of the input can't be accepted
+
+    for state, node in configurations.values():
+        if machine.acceptMask[state]:
+            return True
+    return False
+
+def printConfigurations(machine, configurations):
+    # prints the states the PDA can currently be in (each state once, even if it has several stacks)
+    states = sorted({state for state, node in configurations.values()})
+    print("{" + ", ".join(machine.stateNames[state] for state in states) + "}")
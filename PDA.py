@@ -1,4 +1,7 @@
 # push down automaton
+from array import array # compact, typed arrays used for the flat transition tables of a compiled PDA
+import multiprocessing # worker processes for runPDAParallel
+
 class PDAError(Exception): # exception is a class that all built-in Python errors (like ValueError, TypeError) inherit from.
     pass                   # defining a custom error that behaves like a normal Python exception with subclasses that 
                            # help categorize different types of PDA errors
@@ -26,20 +29,24 @@ class EpsilonTransitionError(PDAError):
     # raised when you find
     pass 
 
+class PDASyntaxError(PDAError):
+    # raised when a definition file isn't written as [Section] ... End blocks (malformed section header,
+    # rule without 5 fields, unclosed /* comment), with the line and column the problem was found at
+    def __init__(self, message, lineNumber, column):
+        super().__init__(f"line {lineNumber}, column {column}: {message}")
+        self.lineNumber = lineNumber
+        self.column = column
+
+class StackDepthError(PDAError):
+    # raised when a run pushes more symbols than the maximum depth of its CompactStack
+    pass
+
 class InputStringError(Exception):
     # raised when there isn't an error with the PDA, but with the input string fed into it (it contains characters not present in the PDA's alphabet)
     pass
 
 # duplicate rule error seen in PDA's no longer found - the PDA transition function allow for multiple destination states for the same source state and symbol
 
-def isComment(string):
-    return string.startswith("#")
-    # return string[0] == "#" would raise an IndexError for an empty string ""
-
-def stringWithoutComments(string):
-    return string[0 : string.index("#")] # does not raise an exception, as function is only called 
-                                         # when character "#" exists in the string, and everything after
-                                         # the first "#" shouldn't be processed
 def isEmptyLine(string):
     return string == ""
 
@@ -59,150 +66,176 @@ def fixUtf8Corruption(possiblyCorruptedString):
         # in either case, the string is returned as it is (uncorrupted or irreparably corrupted).
         return possiblyCorruptedString  # return the original string if no fix was possible
 
+def decodeDefinitionLine(line):
+    # lines of a file opened in binary mode are decoded here, once - as UTF-8, or as Windows-1252 (latin-1
+    # for the bytes it doesn't define) for files saved by older editors
+    try:
+        return line.decode("utf-8")
+    except UnicodeDecodeError:
+        try:
+            return line.decode("cp1252")
+        except UnicodeDecodeError:
+            return line.decode("latin1")
+
+def scanDefinition(lines):
+    # single pass over the lines of a definition file (a file object, or any iterable of lines - read one
+    # at a time, never all at once), shared by every file format using the [Section] ... End layout
+    # yields (lineNumber, column, text) for every line that isn't empty once comments and whitespace are
+    # removed, column being the position of the first character of text (both count from 1)
+    # comments are found left to right: # comments out the rest of the line, /* comments out everything up
+    # to the next */, on the same line or any line below (a # inside a /* */ comment doesn't count)
+    # a line with characters outside ASCII goes through fixUtf8Corruption once (a UTF-8 file that was
+    # read as Windows-1252 and saved again), instead of every field of every rule
+    inMultipleLineComment = False
+    commentLineNumber = commentColumn = 0 # where the open /* comment started, for the error message
+    for lineNumber, line in enumerate(lines, start = 1):
+        if isinstance(line, bytes):
+            line = decodeDefinitionLine(line)
+        if lineNumber == 1 and line.startswith("\ufeff"):
+            line = line[1:] # byte order mark some editors write at the start of UTF-8 files
+        if not line.isascii():
+            line = fixUtf8Corruption(line)
+
+        if not inMultipleLineComment and "#" not in line and "/*" not in line:
+            # fast path - most lines don't have any comment
+            text = line.strip()
+            if text:
+                yield lineNumber, len(line) - len(line.lstrip()) + 1, text
+            continue
+
+        position = 0
+        if inMultipleLineComment:
+            commentEnd = line.find("*/")
+            if commentEnd == -1:
+                continue # the whole line is inside the comment
+            inMultipleLineComment = False
+            position = commentEnd + 2
+        pieces = [] # (start, text) of the parts of the line outside comments
+        while True:
+            lineCommentStart = line.find("#", position)
+            commentStart = line.find("/*", position)
+            if commentStart == -1 or (lineCommentStart != -1 and lineCommentStart < commentStart):
+                pieces.append((position, line[position:] if lineCommentStart == -1 else line[position:lineCommentStart]))
+                break
+            pieces.append((position, line[position:commentStart]))
+            commentEnd = line.find("*/", commentStart + 2)
+            if commentEnd == -1:
+                inMultipleLineComment = True
+                commentLineNumber, commentColumn = lineNumber, commentStart + 1
+                break
+            position = commentEnd + 2
+
+        # the text before and after a one line /* */ comment is joined, like the comment was never there
+        text = "".join(piece for start, piece in pieces).strip()
+        if text:
+            for start, piece in pieces:
+                if piece.strip():
+                    yield lineNumber, start + len(piece) - len(piece.lstrip()) + 1, text
+                    break
+    if inMultipleLineComment:
+        raise PDASyntaxError("comment opened with /* is never closed with */", commentLineNumber, commentColumn)
+
+def isEpsilon(symbol):
+    return symbol == "ε" or symbol.lower() == "epsilon"
+
 def parseFile(inputPDAFile):
-    lines = inputPDAFile.readlines()
+    # inputPDAFile can be opened in text or in binary mode (see decodeDefinitionLine), it is read line by line
     currentSection = "None"
     states = []
     sigma = [] # sigma = alphabet
     stackSigma = []
-    rules = {} # rules[sourceState] = {symbol : destinationState}
-               # tules[sourceState][symbol] = destinationState
+    rules = {} # rules[sourceState][symbol][popSymbol] = {"push" : pushSymbol, "nextState" : destinationState}
+               # a transition function
+               # δ  :  Q    ×   Σ   x   stΣ   x   stΣ        →  P(Q)
+               #     srcSt    symbol  popSymbol  pushSymbol   destStates
+    ruleList = [] # every rule in the order it was read - a nondeterministic PDA can have several rules
+                  # for the same source state, symbol and pop symbol, and the rules dict keeps only the last one
+    rulePositions = [] # (lineNumber, column) of every rule in ruleList, for the errors found by isPDAValid
     start = "None" # a PDA can only have one start state
     accept = [] # a PDA can have multiple accept states
-    inMultipleLineComment = False # boolean variable to allow multiple line comments starting with /* and ending with */
-                               # is true if we are currently inside a multi line comment and we need to skip all lines until */
-    for line in lines:
-        line = line.strip() # eliminating whitespace
-        
-        # continue statements go to next iteration (next line) and are used for readability purposes,
-        # could be replaced by elif statements
-        
-        if isComment(line) or isEmptyLine(line):
-            continue # skipping lines that are comments
-            
-        if "#" in line: # filtering lines that contain comments
-            line = stringWithoutComments(line) # only text before the comment is processed 
-            line = line.strip() # eliminating possible whitespace before first "#" character
-            
-        if not inMultipleLineComment:
-            
-            if "/*" in line:
-                
-                inMultipleLineComment = True # we are inside a multiple line comment
-                # even though we are now in a multiple line comment, it can still be used as a one-liner
-                # and this needs to be checked
-                multipleLineCommentStartIndex = line.find("/*") # gives the position of the first comment opener
-                
-                if "*/" in line:
-
-                    multipleLineCommentLastStartIndex = line.rfind("/*") # more /* can be used in a line, checks for the last one
-                    multipleLineCommentLastEndIndex = line.rfind("*/") # gives the position of the last ending comment symbol
-                    
-                    if multipleLineCommentLastStartIndex < multipleLineCommentLastEndIndex:
-                        # then this is actually a one liner comment
-                        inMultipleLineComment = False
-                        line = line[:multipleLineCommentStartIndex] + line[multipleLineCommentLastEndIndex + 2:] # concatenates string before the comment and after the comment
-                        line = line.strip()
-                        # checks if there is anything to parse before and after the comment
-                        
-                else:   # not a one-liner comment - only need to check before the /* 
-                    
-                    line = line[:multipleLineCommentStartIndex] # checks if there is anything to parse before the comment
-                    line = line.strip()
-                    
-                if isEmptyLine(line):
-                    continue
-            
-            
-            
-        elif inMultipleLineComment: # this means that it's not the first line in the comment
-                                    # elif statement ensures that the parser won't skip lines that are before the start of a multiple line comment
-                                    # for example, q1, 1, q0 /* some text - would be skipped by the continue statement if not for the elif statement
-            if "*/" in line:
-                
-                multipleLineCommentEndIndex = line.rfind("*/")
-                line = line[multipleLineCommentEndIndex + 2:] # the string after the */ (is not a comment)
-                inMultipleLineComment = False
-                line = line.strip()
-                if isEmptyLine(line):
-                    continue
-                
-            else:
-                continue # skip line that is completely within the multiple line comment
-        
+    # the sections that are just a list of names, looked up once per line instead of going through an if-chain
+    # (lines in any other section, or outside sections, are skipped)
+    listSections = {"States" : states, "Sigma" : sigma, "Stack Sigma" : stackSigma, "Accept" : accept}
+    sectionList = None
+    for lineNumber, column, line in scanDefinition(inputPDAFile):
         if line[0] == "[": # new section starts here, filtering opening and closing pharantesis
+            if line[-1] != "]":
+                raise PDASyntaxError(f"section header {line} should end with ]", lineNumber, column)
             currentSection = line[1:-1]
+            sectionList = listSections.get(currentSection)
             continue
         if line == "End":
             currentSection = "None" # searching for new section tag ([SectionName])
+            sectionList = None
             continue
-        
-        if currentSection == "None":
-            continue # skipping line, still searching for section tags ([SectionName])
-        if currentSection == "States":
-            states.append(line) 
-            continue
-        if currentSection == "Sigma":
-            sigma.append(line)
-            continue 
-        if currentSection == "Stack Sigma":
-            stackSigma.append(line)
-        if currentSection == "Rules":
-            sourceState, symbol, popSymbol, pushSymbol, destinationState = line.split(",")
-            sourceState = fixUtf8Corruption(sourceState)
-            sourceState = sourceState.strip()
-            symbol = symbol.strip() 
-            symbol = fixUtf8Corruption(symbol) # fixing any possible corruption that can be caused by file in different encoding from utf-8
-            popSymbol = popSymbol.strip() 
-            popSymbol = fixUtf8Corruption(popSymbol) # fixing any possible corruption that can be caused by file in different encoding from utf-8
-            pushSymbol = pushSymbol.strip() 
-            pushSymbol = fixUtf8Corruption(pushSymbol) # fixing any possible corruption that can be caused by file in different encoding from utf-8
-            destinationState = fixUtf8Corruption(destinationState)
-            destinationState = destinationState.strip()
-            if sourceState not in rules:        
-                rules[sourceState] = {} # initialising with a hashmap
-                
-                                        # a transition function 
-                                        # δ  :  Q    ×   Σ   x   stΣ   x   stΣ        →  P(Q)
-                                        #     srcSt    symbol  popSymbol  pushSymbol   destStates
-            if symbol == "ε" or symbol.lower() == "epsilon":
-                symbol = "epsilon" # will be the symbol present in the dictionary for all epsilon transitions
-                                   # ε looks prettier and more formal - but some older text editors without UTF-8 or 
-                                   # with weirder font styles may not display it correctly
-                                   # or make it too similar with an 'e'
-                                                                                             
-            if symbol not in rules[sourceState]:
-                rules[sourceState][symbol] = {}
-    
-            if popSymbol == "ε" or popSymbol.lower() == "epsilon":
-                popSymbol = "epsilon"
-            
-            rules[sourceState][symbol][popSymbol] = {} 
 
-            if pushSymbol == "ε" or pushSymbol.lower() == "epsilon":
+        if sectionList is not None:
+            sectionList.append(line)
+        elif currentSection == "Rules":
+            fields = line.split(",")
+            if len(fields) != 5:
+                raise PDASyntaxError(f"rule {line} should have 5 comma separated fields (source state, symbol, pop symbol, push symbol, destination state), found {len(fields)}", lineNumber, column)
+            sourceState, symbol, popSymbol, pushSymbol, destinationState = map(str.strip, fields)
+            # epsilon will be the symbol present in the dictionary for all epsilon transitions
+            # ε looks prettier and more formal - but some older text editors without UTF-8 or
+            # with weirder font styles may not display it correctly or make it too similar with an 'e'
+            # (same test as isEpsilon, written out - the length check skips lower() for almost every symbol)
+            if symbol == "ε" or len(symbol) == 7 and symbol.lower() == "epsilon":
+                symbol = "epsilon"
+            if popSymbol == "ε" or len(popSymbol) == 7 and popSymbol.lower() == "epsilon":
+                popSymbol = "epsilon"
+            if pushSymbol == "ε" or len(pushSymbol) == 7 and pushSymbol.lower() == "epsilon":
                 pushSymbol = "epsilon"
-
-            rules[sourceState][symbol][popSymbol] = {
+            elif " " in pushSymbol or "\t" in pushSymbol:
+                pushSymbol = " ".join(pushSymbol.split()) # several symbols pushed at once, see splitPush
+            rule = sourceState, symbol, popSymbol, pushSymbol, destinationState
+            rules.setdefault(sourceState, {}).setdefault(symbol, {})[popSymbol] = {
                 "push" : pushSymbol,
                 "nextState" : destinationState
             }
-
-        if currentSection == "Start":
+            ruleList.append(rule)
+            rulePositions.append((lineNumber, column))
+        elif currentSection == "Start":
             start = line
-            continue
-        if currentSection == "Accept":
-            accept.append(line)
-            continue
-
     inputPDAFile.close()
-    
+
     PDA = states, sigma, stackSigma, rules, start, accept
     # printPDADataStructures(PDA)
-    if not isPDAValid(PDA):
-        return False 
+    if not isPDAValid(PDA, ruleList, rulePositions):
+        return False
     else:
-        # returning 5-tuple
+        # returning 5-tuple, marked as validated so it isn't checked again on every runPDA call
+        return ValidatedPDA(PDA, ruleList)
+
+class ValidatedPDA(tuple):
+    # a PDA tuple that already passed isPDAValid - built by parseFile and freezePDA
+    # it unpacks exactly like the plain tuple (states, sigma, stackSigma, rules, start, accept)
+    # and additionally keeps frozenset versions of the states, alphabets and accept states,
+    # so membership checks while running the PDA are O(1) instead of list scans
+    # it should be treated as immutable - changing its rules after validation isn't checked again
+    # ruleList keeps every rule that was read, including nondeterministic alternatives (see getRuleList)
+    # compiledPDA is the CompiledPDA built from it, kept by compilePDA (or loaded from a cache by loadPDA)
+    def __new__(cls, PDA, ruleList = None):
+        return super().__new__(cls, PDA)
+
+    def __init__(self, PDA, ruleList = None):
+        states, sigma, stackSigma, rules, start, accept = PDA
+        if ruleList is None:
+            ruleList = listRules(rules)
+        self.ruleList = ruleList
+        self.statesSet = frozenset(states)
+        self.sigmaSet = frozenset(sigma)
+        self.stackSigmaSet = frozenset(stackSigma)
+        self.acceptSet = frozenset(accept)
+        self.compiledPDA = None
+
+def freezePDA(PDA):
+    # validates a PDA tuple once and returns it as a ValidatedPDA
+    if isinstance(PDA, ValidatedPDA):
         return PDA
+    if not isPDAValid(PDA):
+        raise PDAError("PDA not valid")
+    return ValidatedPDA(PDA)
     
 def isEmpty(stack):
     return not bool(stack) 
@@ -210,8 +243,28 @@ def isEmpty(stack):
 def top(stack):
     return stack[-1]
 
-def isPDAValid(PDA):
+def listRules(rules):
+    # the rules dict as a list of (sourceState, symbol, popSymbol, pushSymbol, destinationState) tuples
+    return [(sourceState, symbol, popSymbol, rule["push"], rule["nextState"])
+            for sourceState in rules
+            for symbol in rules[sourceState]
+            for popSymbol, rule in rules[sourceState][symbol].items()]
+
+def getRuleList(PDA):
+    # all rules of a PDA, including alternatives for the same (state, symbol, pop symbol) - the rules dict
+    # only keeps the last one of those, which is the one runPDA follows
+    if isinstance(PDA, ValidatedPDA):
+        return PDA.ruleList
+    return listRules(PDA[3])
+
+def isPDAValid(PDA, ruleList = None, rulePositions = None):
+    # ruleList - every rule as it was read (see getRuleList), by default the rules in the rules dict
+    # rulePositions - (lineNumber, column) of every rule in ruleList, added to the error messages
     states, sigma, stackSigma, rules, start, accept = PDA
+    # sets for the membership checks below, the rules walk would otherwise scan the lists for every rule
+    states = set(states)
+    sigma = set(sigma)
+    stackSigma = set(stackSigma)
     if len(sigma) == 0:
         raise UndefinedAlphabetError("Alphabet is not defined")
         return False
@@ -239,40 +292,53 @@ def isPDAValid(PDA):
                 return False
             
             
-    for sourceState in rules: # rules dict key is the source state of the rule
-        # print(sourceState)
-        if sourceState not in states:
-            raise InvalidStateError(f"Source state {sourceState} is not defined in the states list for the PDA")
-            return False
-        
-        for symbol in rules[sourceState]:
-            # print(symbol)
-            if symbol not in sigma and symbol not in ["epsilon", "ε"]: # epsilon doesn't need to be defined in the alphabet
-                raise InvalidSymbolError(f"Symbol {symbol} is not defined in the alphabet for the PDA")
+    if ruleList is None:
+        ruleList = listRules(rules)
+    for ruleNumber, rule in enumerate(ruleList):
+        # every rule is checked, including the alternatives the rules dict only keeps one of
+        try:
+            isRuleValid(rule, states, sigma, stackSigma)
+        except PDAError as error:
+            if rulePositions is None:
+                raise
+            lineNumber, column = rulePositions[ruleNumber]
+            raise type(error)(f"line {lineNumber}, column {column}: {error}") from None
+    return True
+
+def isRuleValid(rule, states, sigma, stackSigma):
+    # checks one (sourceState, symbol, popSymbol, pushSymbol, destinationState) rule against the sets of
+    # states and (stack) symbols of the PDA
+    sourceState, symbol, popSymbol, pushSymbol, destinationState = rule
+    if sourceState not in states:
+        raise InvalidStateError(f"Source state {sourceState} is not defined in the states list for the PDA")
+        return False
+
+    if symbol not in sigma and symbol not in ["epsilon", "ε"]: # epsilon doesn't need to be defined in the alphabet
+        raise InvalidSymbolError(f"Symbol {symbol} is not defined in the alphabet for the PDA")
+        return False
+    elif symbol in ["epsilon", "ε"] and symbol in sigma:
+        raise EpsilonTransitionError("Epsilon doesn't need to be defined in the alphabet for the PDA (it includes it by default). You can use 'epsilon' or 'ε' in your rules without defining epsilon or ε.")
+
+    if popSymbol not in stackSigma and popSymbol not in ["epsilon", "ε"]: # epsilon doesn't need to be defined in the alphabet
+        raise InvalidSymbolError(f"Symbol {popSymbol} is not defined in the stack alphabet for the PDA")
+        return False
+    elif popSymbol in ["epsilon", "ε"] and popSymbol in stackSigma:
+        raise EpsilonTransitionError("Epsilon doesn't need to be defined in the stack alphabet for the PDA (it includes it by default). You can use 'epsilon' or 'ε' in your rules without defining epsilon or ε.")
+
+    if pushSymbol in ["epsilon", "ε"] and pushSymbol in stackSigma:
+        raise EpsilonTransitionError("Epsilon doesn't need to be defined in the stack alphabet for the PDA (it includes it by default). You can use 'epsilon' or 'ε' in your rules without defining epsilon or ε.")
+    elif pushSymbol not in ["epsilon", "ε"]: # epsilon doesn't need to be defined in the alphabet
+        # a push string is one or more stack symbols separated by spaces
+        for symbol in pushSymbol.split():
+            if symbol in ["epsilon", "ε"]:
+                raise InvalidSymbolError(f"Push string {pushSymbol} contains epsilon, which can only be pushed on its own (it pushes nothing)")
+            if symbol not in stackSigma:
+                raise InvalidSymbolError(f"Symbol {symbol} is not defined in the stack alphabet for the PDA")
                 return False
-            elif symbol in ["epsilon", "ε"] and symbol in sigma:
-                raise EpsilonTransitionError("Epsilon doesn't need to be defined in the alphabet for the PDA (it includes it by default). You can use 'epsilon' or 'ε' in your rules without defining epsilon or ε.")
-            
-            for popSymbol in rules[sourceState][symbol]:
-                if popSymbol not in stackSigma and popSymbol not in ["epsilon", "ε"]: # epsilon doesn't need to be defined in the alphabet
-                    raise InvalidSymbolError(f"Symbol {popSymbol} is not defined in the stack alphabet for the PDA")
-                    return False
-                elif symbol in ["epsilon", "ε"] and symbol in sigma:
-                    raise EpsilonTransitionError("Epsilon doesn't need to be defined in the stack alphabet for the PDA (it includes it by default). You can use 'epsilon' or 'ε' in your rules without defining epsilon or ε.")
-            # for destinationState in rules[sourceState][symbol]: not for, as there is only one destinationState, this for would split the destinationState
-            # string character by character
-
-                pushSymbol = rules[sourceState][symbol][popSymbol]["push"]
-                if pushSymbol not in stackSigma and pushSymbol not in ["epsilon", "ε"]: # epsilon doesn't need to be defined in the alphabet
-                    raise InvalidSymbolError(f"Symbol {pushSymbol} is not defined in the stack alphabet for the PDA")
-                    return False
-                elif pushSymbol in ["epsilon", "ε"] and pushSymbol in stackSigma:
-                    raise EpsilonTransitionError("Epsilon doesn't need to be defined in the stack alphabet for the PDA (it includes it by default). You can use 'epsilon' or 'ε' in your rules without defining epsilon or ε.")
-                destinationState = rules[sourceState][symbol][popSymbol]["nextState"]
-                if destinationState not in states:
-                        raise InvalidStateError(f"Destination state {destinationState} is not defined in the states list for the PDA")                            # print(sourceState, symbol, destinationState)
-                        return False
-                        # traverses all rules in the dictionary, looking for source states, destination states and symbols
+
+    if destinationState not in states:
+        raise InvalidStateError(f"Destination state {destinationState} is not defined in the states list for the PDA")
+        return False
     return True
 
 def printPDADataStructures(PDA):
@@ -296,6 +362,14 @@ def isStringValid(string, stringSeparator, sigma):
             return False
     return True
 
+def splitPush(pushSymbol):
+    # the stack symbols a rule pushes, in the order they are appended to the stack (bottom first)
+    # the push field of a rule is epsilon, a stack symbol, or several stack symbols separated by spaces -
+    # "A B C" pushes C, then B, then A, so the leftmost symbol ends on top (like a grammar body)
+    if pushSymbol in ["epsilon", "ε"]:
+        return ()
+    return tuple(reversed(pushSymbol.split()))
+
 def getNextState(currentState, currentSymbol, rules, stack):
     if currentState not in rules:
         return currentState # considered by default for every state, if a rule is not specified, the pda stays in the same state
@@ -313,13 +387,19 @@ def getNextState(currentState, currentSymbol, rules, stack):
             oldStackTop = top(stack)
             stack.pop()
             if pushSymbol != "epsilon":
-                stack.append(pushSymbol)
+                if " " in pushSymbol:
+                    stack.extend(splitPush(pushSymbol))
+                else:
+                    stack.append(pushSymbol)
             destinationState = rules[currentState][currentSymbol][oldStackTop]["nextState"]
             return destinationState
     else: # rules[currentState][currentSymbol] == "epsilon"
         pushSymbol = rules[currentState][currentSymbol]["epsilon"]["push"]
         if pushSymbol != "epsilon":
-            stack.append(pushSymbol)
+            if " " in pushSymbol:
+                stack.extend(splitPush(pushSymbol))
+            else:
+                stack.append(pushSymbol)
         destinationState = rules[currentState][currentSymbol]["epsilon"]["nextState"]
         return destinationState
     
@@ -331,43 +411,895 @@ def splitIncludingNoSeparator(string, separator):
     else:                # removes redudant code, by calling getNextState only once
         return string.split(separator)
     
+def epsilonMove(currentState, rules, stackTop):
+    # the epsilon move the PDA takes from currentState when stackTop is on top of the stack (None if the
+    # stack is empty) - a rule that pops the top has priority over a rule that doesn't pop anything
+    # returns (popsTop, pushSymbols, nextState), pushSymbols the tuple of symbols pushed (bottom first, see
+    # splitPush), or None if there is no such move
+    if currentState not in rules or "epsilon" not in rules[currentState]:
+        return None
+    epsilonRules = rules[currentState]["epsilon"]
+    if stackTop is not None and stackTop in epsilonRules:
+        rule = epsilonRules[stackTop]
+        popsTop = True
+    elif "epsilon" in epsilonRules:
+        rule = epsilonRules["epsilon"]
+        popsTop = False
+    else:
+        return None
+    return popsTop, splitPush(rule["push"]), rule["nextState"]
+
+NO_CYCLE = 0
+EPSILON_LOOP = 1 # epsilon moves that come back to the same state with the same stack
+UNBOUNDED_PUSH = 2 # epsilon moves that come back to the same state and stack top, with more pushed below it
+
+def followEpsilonMoves(state, stackTop, findMove):
+    # follows epsilon moves from state, with stackTop on top of the stack (None for an empty stack), until
+    # no epsilon move applies - findMove(state, stackTop) gives the move, like epsilonMove does
+    # only the top of the stack is known: if the moves pop it (and everything pushed after it), what comes
+    # next depends on the symbol below, so the walk stops there and the caller continues from the new top
+    #
+    # epsilon moves can go on forever, so the walk stops before the move that would close a cycle:
+    # - coming back to the same state with the same stack repeats the same moves in a loop
+    # - coming back to a (state, stack top) pair higher up, while the stack position of the earlier visit was
+    #   never popped in between, repeats the same moves pushing more every time (moves only depend on the
+    #   state and the stack top). Every stack position gets a generation number when it is pushed, so "never
+    #   popped" means the position still has the generation it had at the earlier visit.
+    #
+    # returns (nextState, pops, pushSymbols, continues, cycle):
+    #     pops - 1 if the original stack top was popped, 0 otherwise
+    #     pushSymbols - what is on the stack above the original part afterwards, bottom first
+    #     continues - True if the walk stopped because it needs the symbol below the original top
+    #     cycle - NO_CYCLE, or EPSILON_LOOP/UNBOUNDED_PUSH if the walk was cut at a cycle
+    known = [] if stackTop is None else [stackTop] # the part of the stack the walk knows about, bottom first
+    generations = [0] * len(known) # generation number of every known stack position
+    original = len(known) # 1 while the original top is still on the stack, 0 once it was popped
+    lastGeneration = 0
+    configurations = {(state, tuple(known))} # every (state, known stack) the walk went through
+    visits = {(state, stackTop) : [(len(known), 0)]} # (state, stack top) -> [(height, generation of the top)]
+    cycle = NO_CYCLE
+    while True:
+        move = findMove(state, known[-1] if known else None)
+        if move is None:
+            break
+        popsTop, pushSymbols, nextState = move
+        height = len(known) - popsTop # height after the pop, before the push
+        if height == 0 and not pushSymbols and stackTop is not None:
+            # everything the walk knows about was popped - the next move depends on the symbol below
+            return nextState, 1, (), True, NO_CYCLE
+        nextKnown = tuple(known[:height]) + pushSymbols
+        if (nextState, nextKnown) in configurations:
+            cycle = EPSILON_LOOP
+            break
+        nextTop = nextKnown[-1] if nextKnown else None
+        earlierVisits = visits.setdefault((nextState, nextTop), [])
+        # visits whose stack position was popped since can't close a cycle anymore
+        earlierVisits[:] = [(visitHeight, generation) for visitHeight, generation in earlierVisits
+                            if visitHeight <= height and (visitHeight == 0 or generations[visitHeight - 1] == generation)]
+        if any(visitHeight < len(nextKnown) for visitHeight, generation in earlierVisits):
+            cycle = UNBOUNDED_PUSH
+            break
+        # a move pushing several symbols is checked like that many moves pushing one symbol each - the points
+        # in between are visited as (state, stack top the move started from, symbols pushed so far). Without
+        # them a move like "pop A, push A A", which replaces every stack top it visits, would grow the stack
+        # without ever closing a cycle
+        moveStart = (state, known[-1] if known else None)
+        middleVisits = []
+        for pushed in range(1, len(pushSymbols)):
+            middleVisits.append(visits.setdefault(moveStart + (pushed,), []))
+            middleVisits[-1][:] = [(visitHeight, generation) for visitHeight, generation in middleVisits[-1]
+                                   if visitHeight <= height and (visitHeight == 0 or generations[visitHeight - 1] == generation)]
+            if any(visitHeight < height + pushed for visitHeight, generation in middleVisits[-1]):
+                cycle = UNBOUNDED_PUSH
+                break
+        if cycle != NO_CYCLE:
+            break
+        if popsTop:
+            known.pop()
+            generations.pop()
+            if len(known) < original:
+                original = 0
+        for pushed, pushSymbol in enumerate(pushSymbols):
+            lastGeneration += 1
+            known.append(pushSymbol)
+            generations.append(lastGeneration)
+            if pushed < len(middleVisits):
+                middleVisits[pushed].append((len(known), lastGeneration))
+        state = nextState
+        configurations.add((state, nextKnown))
+        earlierVisits.append((len(known), generations[-1] if known else 0))
+    pops = 1 if stackTop is not None and original == 0 else 0
+    return state, pops, tuple(known[original:]), False, cycle
+
 def epsilonClosure(currentState, rules, stack):
-    if currentState not in rules:
-        return currentState
-    if "epsilon" in rules[currentState]:
-        if isEmpty(stack):
-            if "epsilon" in rules[currentState]["epsilon"]:
-                pushSymbol = rules[currentState]["epsilon"]["epsilon"]["push"]
-                if pushSymbol != "epsilon":
-                    stack.append(pushSymbol)
-                currentState = rules[currentState]["epsilon"]["epsilon"]["nextState"]
-        else:
-            if top(stack) in rules[currentState]["epsilon"]:
-                oldStackTop = top(stack)
-                stack.pop()
-                pushSymbol = rules[currentState]["epsilon"][oldStackTop]["push"]
-                if pushSymbol != "epsilon":
-                    stack.append(pushSymbol)
-                currentState = rules[currentState]["epsilon"][oldStackTop]["nextState"]
-            elif "epsilon" in rules[currentState]["epsilon"]:
-                pushSymbol = rules[currentState]["epsilon"]["epsilon"]["push"]
-                if pushSymbol != "epsilon":
-                    stack.append(pushSymbol)
-                currentState = rules[currentState]["epsilon"]["epsilon"]["nextState"]
+    # follows epsilon moves from currentState until none applies (see followEpsilonMoves)
+    while True:
+        stackTop = None if isEmpty(stack) else top(stack)
+        currentState, pops, pushSymbols, continues, cycle = followEpsilonMoves(currentState, stackTop,
+            lambda state, stackTop: epsilonMove(state, rules, stackTop))
+        if pops:
+            stack.pop()
+        stack.extend(pushSymbols)
+        if not continues:
+            return currentState
+
 
     return currentState
 
 
-def runPDA(PDA, inputString, stringSeparator, printPDASteps = True):
+def findConflicts(PDA):
+    # the pairs of rules that make the PDA nondeterministic - two rules of the same state that could both
+    # apply with the same stack top:
+    # - alternatives for the same state, symbol and pop symbol (only one of them is kept in the rules dict)
+    # - a rule that pops the stack top and a rule that doesn't pop, for the same input symbol (or both epsilon)
+    # - an epsilon rule and a rule reading an input symbol, that pop the same stack top (or one of them doesn't pop)
+    # returns a list of (rule, otherRule, reason), the rules as (sourceState, symbol, popSymbol, pushSymbol,
+    # destinationState) - the PDA is deterministic if the list is empty
+    rulesByState = {}
+    for rule in getRuleList(PDA):
+        sourceState, symbol, popSymbol, pushSymbol, destinationState = rule
+        rule = (sourceState, "epsilon" if isEpsilon(symbol) else symbol, "epsilon" if isEpsilon(popSymbol) else popSymbol,
+                "epsilon" if isEpsilon(pushSymbol) else pushSymbol, destinationState)
+        stateRules = rulesByState.setdefault(sourceState, {})
+        if rule not in stateRules: # the same rule written twice is still a single choice
+            stateRules[rule] = None
+
+    conflicts = []
+    for stateRules in rulesByState.values():
+        # rules[symbol][popSymbol] - the list of rules of the state, so only rules that can conflict are paired
+        rules = {}
+        for rule in stateRules:
+            rules.setdefault(rule[1], {}).setdefault(rule[2], []).append(rule)
+        for symbol, symbolRules in rules.items():
+            for popSymbol, alternatives in symbolRules.items():
+                for position, rule in enumerate(alternatives):
+                    for otherRule in alternatives[position + 1:]:
+                        conflicts.append((rule, otherRule, f"both read {symbol} and pop {popSymbol}"))
+                if popSymbol != "epsilon":
+                    for rule in symbolRules.get("epsilon", ()):
+                        for otherRule in alternatives:
+                            conflicts.append((rule, otherRule, f"both read {symbol} with {popSymbol} on top of the stack, one of them doesn't pop"))
+        for popSymbol, epsilonRules in rules.get("epsilon", {}).items():
+            for symbol, symbolRules in rules.items():
+                if symbol == "epsilon":
+                    continue
+                if popSymbol == "epsilon":
+                    otherRules = [otherRule for alternatives in symbolRules.values() for otherRule in alternatives]
+                else:
+                    otherRules = symbolRules.get(popSymbol, []) + symbolRules.get("epsilon", [])
+                for rule in epsilonRules:
+                    for otherRule in otherRules:
+                        conflicts.append((rule, otherRule, f"epsilon move and a move reading {symbol}, with the same stack top"))
+    return conflicts
+
+def findInputConflicts(conflicts):
+    # the conflicts between two rules that read an input symbol - the only ones a run has to choose between
+    # while it reads the input, epsilon moves are only followed before the first symbol and after the last
+    # one, through the precomputed closures of compilePDA
+    return [conflict for conflict in conflicts if conflict[0][1] != "epsilon" and conflict[1][1] != "epsilon"]
+
+def describeConflicts(conflicts):
+    # the conflicts found by findConflicts as text, one pair of rules per line
+    if not conflicts:
+        return "deterministic: no two rules can apply in the same state with the same stack top"
+    lines = [f"nondeterministic: {len(conflicts)} conflicting pair(s) of rules"]
+    for rule, otherRule, reason in conflicts:
+        lines.append(f"    {', '.join(rule)}  /  {', '.join(otherRule)}   ({reason})")
+    return "\n".join(lines)
+
+NO_RULE = -1 # marks an empty slot in the flat tables of a compiled PDA (no rule / nothing to push)
+PUSH_STRING = -2 # push codes from PUSH_STRING down stand for rules pushing several symbols (see CompiledPDA)
+
+class CompiledPDA:
+    # compact form of the tuple returned by parseFile, built by compilePDA
+    # states, input symbols and stack symbols are interned as small ints (their position in the
+    # names lists), so a step of the PDA is a couple of array lookups instead of hashing strings
+    # through three levels of dicts
+    #
+    # input symbol codes go from 0 to numSymbols - 1, the extra column numSymbols stands for epsilon
+    # for every (state, symbol) pair, the table row is
+    #     row = state * (numSymbols + 1) + symbol
+    # noPopNext[row] / noPopPush[row]           - rule that doesn't pop anything (pop symbol epsilon)
+    # popNext[row * numStackSymbols + top]      - rule that pops the stack symbol top
+    # popPush[row * numStackSymbols + top]
+    # the *Next arrays hold the destination state (NO_RULE if the rule doesn't exist), the
+    # *Push arrays hold the stack symbol that is pushed (NO_RULE for epsilon) - a rule pushing several
+    # symbols has PUSH_STRING - n there instead, and pushStrings[n] is the tuple of codes it pushes (bottom first)
+    # deadMask marks the states from which no accept state can be reached by any rule - once the PDA
+    # is in one of them the input string is rejected, whatever symbols follow, so the untraced runs of
+    # runCompiledPDA (and runPDAStream) stop there instead of reading the rest of the input
+    #
+    # the epsilon closure of every (state, stack top) pair is precomputed with followEpsilonMoves, at
+    #     cell = state * (numStackSymbols + 1) + top          (top numStackSymbols for an empty stack)
+    # closureNext[cell] is the state it ends in (NO_RULE if no epsilon move applies), closurePop[cell] is 1
+    # if it pops the top, closurePush[cell] is the tuple of stack symbols it leaves above that (bottom
+    # first), closureContinues[cell] is 1 if it has to go on from the symbol below the top, and
+    # closureCycle[cell] records the epsilon cycle it was cut at (NO_CYCLE, EPSILON_LOOP or UNBOUNDED_PUSH)
+    #
+    # deterministic is True if no two rules reading an input symbol conflict (see findInputConflicts) - then
+    # every (state, symbol, stack top) has at most one move, and runCompiledPDA runs on a single table:
+    #     cell = state * stride + top * numSymbols + symbol     stride = (numStackSymbols + 1) * numSymbols
+    # (top numStackSymbols for an empty stack). moveNext[cell] is the next state times stride (the start of
+    # its block of cells, so the next cell is found with two additions), moveAction[cell] is what the move
+    # does to the stack (MOVE_KEEP, MOVE_PUSH, MOVE_POP, MOVE_REPLACE the top, or MOVE_PUSH_STRING /
+    # MOVE_REPLACE_STRING for several symbols) and movePush[cell] the symbol it pushes, times numSymbols like
+    # the stack tops (for the string moves, the position of the pushed symbols in movePushStrings, where they
+    # are also stored times numSymbols). Cells without a rule stay in the same state. The moves into a dead
+    # state are MOVE_DEAD instead, the run stops there (without doing what the move does to the stack).
+    # for a nondeterministic PDA these tables are empty
+    __slots__ = ("stateNames", "stateIndex", "symbolNames", "symbolIndex", "stackNames", "stackIndex",
+                 "numSymbols", "numStackSymbols", "start", "acceptMask", "deadMask",
+                 "noPopNext", "noPopPush", "popNext", "popPush", "pushStrings",
+                 "closureNext", "closurePop", "closurePush", "closureContinues", "closureCycle",
+                 "deterministic", "moveNext", "moveAction", "movePush", "movePushStrings")
+
+    def step(self, state, symbol, stack):
+        # same convention as getNextState - if no rule matches, the PDA stays in the same state
+        row = state * (self.numSymbols + 1) + symbol
+        nextState = self.noPopNext[row]
+        if nextState != NO_RULE:
+            pushSymbol = self.noPopPush[row]
+            if pushSymbol >= 0:
+                stack.append(pushSymbol)
+            elif pushSymbol != NO_RULE:
+                stack.extend(self.pushStrings[PUSH_STRING - pushSymbol])
+            return nextState
+        if not stack:
+            return state
+        cell = row * self.numStackSymbols + stack[-1]
+        nextState = self.popNext[cell]
+        if nextState == NO_RULE:
+            return state
+        stack.pop()
+        pushSymbol = self.popPush[cell]
+        if pushSymbol >= 0:
+            stack.append(pushSymbol)
+        elif pushSymbol != NO_RULE:
+            stack.extend(self.pushStrings[PUSH_STRING - pushSymbol])
+        return nextState
+
+    def pushedSymbols(self, pushSymbol):
+        # the tuple of codes a *Push table entry pushes, bottom first
+        if pushSymbol >= 0:
+            return (pushSymbol,)
+        if pushSymbol == NO_RULE:
+            return ()
+        return self.pushStrings[PUSH_STRING - pushSymbol]
+
+    def epsilonMove(self, state, stackTop):
+        # same as epsilonMove, on the compiled tables (stackTop None for an empty stack)
+        row = state * (self.numSymbols + 1) + self.numSymbols # epsilon column
+        if stackTop is not None:
+            cell = row * self.numStackSymbols + stackTop
+            if self.popNext[cell] != NO_RULE:
+                return True, self.pushedSymbols(self.popPush[cell]), self.popNext[cell]
+        if self.noPopNext[row] != NO_RULE:
+            return False, self.pushedSymbols(self.noPopPush[row]), self.noPopNext[row]
+        return None
+
+    def epsilonClosure(self, state, stack, trace = None, step = 0):
+        # same behaviour as epsilonClosure, with one lookup in the precomputed closure tables per
+        # (state, stack top) - only more than one if the epsilon moves pop below the top they started from
+        # trace - TraceRecorder (see PDATrace.py) the stack operations are recorded to, as events of the
+        # given step with the epsilon symbol code (numSymbols)
+        width = self.numStackSymbols + 1
+        while True:
+            cell = state * width + (stack[-1] if stack else self.numStackSymbols)
+            nextState = self.closureNext[cell]
+            if nextState == NO_RULE:
+                return state
+            popSymbol = NO_RULE
+            if self.closurePop[cell]:
+                popSymbol = stack[-1]
+                stack.pop()
+            if self.closurePush[cell]:
+                stack.extend(self.closurePush[cell])
+            if trace is not None:
+                # one event per pushed symbol, the first one also carrying the state change and the pop
+                pushSymbols = self.closurePush[cell] or (NO_RULE,)
+                trace.record(step, self.numSymbols, state, nextState, popSymbol, pushSymbols[0])
+                for pushSymbol in pushSymbols[1:]:
+                    trace.record(step, self.numSymbols, nextState, nextState, NO_RULE, pushSymbol)
+            state = nextState
+            if not self.closureContinues[cell]:
+                return state
+
+    def tracedStep(self, state, symbol, stack, trace, step):
+        # same as step, recording the move (or the stay in the same state) to trace as one event - a move
+        # pushing several symbols adds one more event for every symbol after the first one
+        row = state * (self.numSymbols + 1) + symbol
+        nextState = self.noPopNext[row]
+        popSymbol = pushSymbol = NO_RULE
+        if nextState != NO_RULE:
+            pushSymbol = self.noPopPush[row]
+        elif stack and self.popNext[row * self.numStackSymbols + stack[-1]] != NO_RULE:
+            cell = row * self.numStackSymbols + stack[-1]
+            nextState = self.popNext[cell]
+            popSymbol = stack[-1]
+            stack.pop()
+            pushSymbol = self.popPush[cell]
+        else:
+            nextState = state
+        pushSymbols = self.pushedSymbols(pushSymbol)
+        stack.extend(pushSymbols)
+        trace.record(step, symbol, state, nextState, popSymbol, pushSymbols[0] if pushSymbols else NO_RULE)
+        for pushSymbol in pushSymbols[1:]:
+            trace.record(step, symbol, nextState, nextState, NO_RULE, pushSymbol)
+        return nextState
+
+def internNames(names):
+    # gives every distinct name a small int code, in order of first appearance
+    index = {}
+    for name in names:
+        if name not in index:
+            index[name] = len(index)
+    return list(index), index
+
+def compilePDA(PDA):
+    # turns the tuple returned by parseFile into a CompiledPDA that runPDA can execute on a fast path
+    PDA = freezePDA(PDA) # no-op for the ValidatedPDA returned by parseFile
+    if PDA.compiledPDA is not None:
+        return PDA.compiledPDA # compiled before, the tables only depend on the (immutable) PDA
+    states, sigma, stackSigma, rules, start, accept = PDA
+
+    compiled = CompiledPDA()
+    compiled.stateNames, compiled.stateIndex = internNames(states)
+    compiled.symbolNames, compiled.symbolIndex = internNames(sigma)
+    compiled.stackNames, compiled.stackIndex = internNames(stackSigma)
+    compiled.numSymbols = len(compiled.symbolNames)
+    compiled.numStackSymbols = len(compiled.stackNames)
+    compiled.start = compiled.stateIndex[start]
+    compiled.acceptMask = bytearray(len(compiled.stateNames))
+    for acceptState in accept:
+        compiled.acceptMask[compiled.stateIndex[acceptState]] = 1
+
+    rows = len(compiled.stateNames) * (compiled.numSymbols + 1)
+    compiled.noPopNext = array("i", [NO_RULE]) * rows
+    compiled.noPopPush = array("i", [NO_RULE]) * rows
+    compiled.popNext = array("i", [NO_RULE]) * (rows * compiled.numStackSymbols)
+    compiled.popPush = array("i", [NO_RULE]) * (rows * compiled.numStackSymbols)
+    compiled.pushStrings = []
+    pushStringIndex = {} # push string -> its code, every distinct string is stored once
+
+    for sourceState in rules:
+        for symbol in rules[sourceState]:
+            if symbol in ["epsilon", "ε"]:
+                symbolCode = compiled.numSymbols
+            else:
+                symbolCode = compiled.symbolIndex[symbol]
+            row = compiled.stateIndex[sourceState] * (compiled.numSymbols + 1) + symbolCode
+            for popSymbol, rule in rules[sourceState][symbol].items():
+                pushSymbols = tuple(compiled.stackIndex[pushSymbol] for pushSymbol in splitPush(rule["push"]))
+                if not pushSymbols:
+                    pushCode = NO_RULE
+                elif len(pushSymbols) == 1:
+                    pushCode = pushSymbols[0]
+                else:
+                    if pushSymbols not in pushStringIndex:
+                        pushStringIndex[pushSymbols] = PUSH_STRING - len(compiled.pushStrings)
+                        compiled.pushStrings.append(pushSymbols)
+                    pushCode = pushStringIndex[pushSymbols]
+                nextState = compiled.stateIndex[rule["nextState"]]
+                if popSymbol in ["epsilon", "ε"]:
+                    compiled.noPopNext[row] = nextState
+                    compiled.noPopPush[row] = pushCode
+                else:
+                    cell = row * compiled.numStackSymbols + compiled.stackIndex[popSymbol]
+                    compiled.popNext[cell] = nextState
+                    compiled.popPush[cell] = pushCode
+
+    compiled.deadMask = findDeadStates(compiled.stateIndex, rules, accept)
+
+    # epsilon closures, computed once here so that running the PDA only looks them up
+    numStackSymbols = compiled.numStackSymbols
+    cells = len(compiled.stateNames) * (numStackSymbols + 1)
+    compiled.closureNext = array("i", [NO_RULE]) * cells
+    compiled.closurePop = bytearray(cells)
+    compiled.closurePush = [()] * cells
+    compiled.closureContinues = bytearray(cells)
+    compiled.closureCycle = bytearray(cells)
+    for state in range(len(compiled.stateNames)):
+        for stackTop in range(numStackSymbols + 1):
+            cell = state * (numStackSymbols + 1) + stackTop
+            nextState, pops, pushSymbols, continues, cycle = followEpsilonMoves(
+                state, None if stackTop == numStackSymbols else stackTop, compiled.epsilonMove)
+            compiled.closureCycle[cell] = cycle
+            if (nextState, pops, pushSymbols, continues) != (state, 0, (), False):
+                compiled.closureNext[cell] = nextState
+                compiled.closurePop[cell] = pops
+                compiled.closurePush[cell] = pushSymbols
+                compiled.closureContinues[cell] = continues
+    compiled.deterministic = not findInputConflicts(findConflicts(PDA))
+    compiled.moveNext = array("i")
+    compiled.moveAction = bytearray()
+    compiled.movePush = array("i")
+    compiled.movePushStrings = []
+    if compiled.deterministic:
+        compileMoves(compiled)
+    PDA.compiledPDA = compiled
+    return compiled
+
+MOVE_KEEP = 0 # the stack stays as it is
+MOVE_PUSH = 1
+MOVE_POP = 2
+MOVE_REPLACE = 3 # pops the top and pushes a symbol in its place
+MOVE_PUSH_STRING = 4 # pushes several symbols
+MOVE_REPLACE_STRING = 5 # pops the top and pushes several symbols
+MOVE_DEAD = 6 # moves into a dead state - the input string is rejected, the run stops
+
+def compileMoves(compiled):
+    # the single move table of a deterministic CompiledPDA (see CompiledPDA)
+    numSymbols = compiled.numSymbols
+    numStackSymbols = compiled.numStackSymbols
+    stride = (numStackSymbols + 1) * numSymbols
+    moveNext = array("i")
+    for state in range(len(compiled.stateNames)):
+        moveNext.extend(array("i", [state * stride]) * stride) # no rule - stays in the same state
+    moveAction = bytearray(len(moveNext))
+    movePush = array("i", [0]) * len(moveNext)
+    movePushStrings = [tuple(pushSymbol * numSymbols for pushSymbol in pushSymbols) for pushSymbols in compiled.pushStrings]
+    for state in range(len(compiled.stateNames)):
+        for symbol in range(numSymbols):
+            row = state * (numSymbols + 1) + symbol
+            if compiled.noPopNext[row] != NO_RULE:
+                # the rule doesn't look at the stack, it is the move for every stack top
+                pushSymbol = compiled.noPopPush[row]
+                for top in range(numStackSymbols + 1):
+                    cell = state * stride + top * numSymbols + symbol
+                    moveNext[cell] = compiled.noPopNext[row] * stride
+                    if pushSymbol >= 0:
+                        moveAction[cell] = MOVE_PUSH
+                        movePush[cell] = pushSymbol * numSymbols
+                    elif pushSymbol != NO_RULE:
+                        moveAction[cell] = MOVE_PUSH_STRING
+                        movePush[cell] = PUSH_STRING - pushSymbol
+                continue
+            for top in range(numStackSymbols):
+                nextState = compiled.popNext[row * numStackSymbols + top]
+                if nextState == NO_RULE:
+                    continue
+                cell = state * stride + top * numSymbols + symbol
+                moveNext[cell] = nextState * stride
+                pushSymbol = compiled.popPush[row * numStackSymbols + top]
+                if pushSymbol == NO_RULE:
+                    moveAction[cell] = MOVE_POP
+                elif pushSymbol < 0:
+                    moveAction[cell] = MOVE_REPLACE_STRING
+                    movePush[cell] = PUSH_STRING - pushSymbol
+                elif pushSymbol != top:
+                    moveAction[cell] = MOVE_REPLACE
+                    movePush[cell] = pushSymbol * numSymbols
+    for cell in range(len(moveNext)):
+        if compiled.deadMask[moveNext[cell] // stride]:
+            moveAction[cell] = MOVE_DEAD
+    compiled.moveNext = moveNext
+    compiled.moveAction = moveAction
+    compiled.movePush = movePush
+    compiled.movePushStrings = movePushStrings
+
+def runMoves(compiled, state, symbols, stack):
+    # the input loop of runCompiledPDA for a deterministic PDA - one lookup in the move table per symbol,
+    # with the stack top kept in a local variable. Returns the state the PDA is in after the last symbol
+    # (or the dead state it stopped in), the stack is changed in place
+    numSymbols = compiled.numSymbols
+    stride = (compiled.numStackSymbols + 1) * numSymbols
+    moveNext = compiled.moveNext
+    moveAction = compiled.moveAction
+    movePush = compiled.movePush
+    movePushStrings = compiled.movePushStrings
+    # stack symbols are stored times numSymbols while the loop runs, the empty stack is a symbol at the bottom
+    stack[:] = [compiled.numStackSymbols * numSymbols] + [stackSymbol * numSymbols for stackSymbol in stack]
+    top = stack.pop()
+    base = state * stride
+    if compiled.deadMask[state]:
+        symbols = ()
+    for symbol in symbols:
+        cell = base + top + symbol
+        action = moveAction[cell]
+        if action:
+            if action == MOVE_PUSH:
+                stack.append(top)
+                top = movePush[cell]
+            elif action == MOVE_POP:
+                top = stack.pop()
+            elif action == MOVE_REPLACE:
+                top = movePush[cell]
+            elif action == MOVE_DEAD:
+                base = moveNext[cell]
+                break
+            else:
+                pushSymbols = movePushStrings[movePush[cell]]
+                if action == MOVE_PUSH_STRING:
+                    stack.append(top)
+                stack.extend(pushSymbols[:-1])
+                top = pushSymbols[-1]
+        base = moveNext[cell]
+    stack.append(top)
+    stack[:] = [stackSymbol // numSymbols for stackSymbol in stack[1:]]
+    return base // stride
+
+def runCompactMoves(compiled, state, symbols, stack):
+    # runMoves on a CompactStack - the top run (its symbol and count) is kept in local variables, and the
+    # runs below it in the arrays of the stack. Raises StackDepthError when the stack grows deeper than its
+    # maximumDepth, with the stack as it was after the push that went over it
+    numSymbols = compiled.numSymbols
+    stride = (compiled.numStackSymbols + 1) * numSymbols
+    moveNext = compiled.moveNext
+    moveAction = compiled.moveAction
+    movePush = compiled.movePush
+    movePushStrings = compiled.movePushStrings
+    runSymbols = stack.runSymbols
+    runCounts = stack.runCounts
+    maximumDepth = UNLIMITED_DEPTH if stack.maximumDepth is None else stack.maximumDepth
+    # like in runMoves, symbols are stored times numSymbols and the empty stack is a run at the bottom
+    for position in range(len(runSymbols)):
+        runSymbols[position] *= numSymbols
+    runSymbols.insert(0, compiled.numStackSymbols * numSymbols)
+    runCounts.insert(0, 1)
+    top = runSymbols.pop()
+    count = runCounts.pop()
+    below = stack.depth - count # symbols below the top run (-1 when the top run is the empty stack run)
+    countLimit = maximumDepth - below # the top run can't get longer than this
+    base = state * stride
+    if compiled.deadMask[state]:
+        symbols = ()
+    for symbol in symbols:
+        cell = base + top + symbol
+        action = moveAction[cell]
+        if action:
+            if action == MOVE_DEAD:
+                base = moveNext[cell]
+                break
+            if action == MOVE_PUSH:
+                pushSymbol = movePush[cell]
+                if pushSymbol == top:
+                    count += 1
+                else:
+                    runSymbols.append(top)
+                    runCounts.append(count)
+                    below += count
+                    countLimit = maximumDepth - below
+                    top = pushSymbol
+                    count = 1
+                if count > countLimit:
+                    break
+            elif action == MOVE_POP:
+                count -= 1
+                if not count:
+                    top = runSymbols.pop()
+                    count = runCounts.pop()
+                    below -= count
+                    countLimit = maximumDepth - below
+            else:
+                if action != MOVE_PUSH_STRING:
+                    count -= 1
+                    if not count:
+                        top = runSymbols.pop()
+                        count = runCounts.pop()
+                        below -= count
+                        countLimit = maximumDepth - below
+                pushSymbols = (movePush[cell],) if action == MOVE_REPLACE else movePushStrings[movePush[cell]]
+                for pushSymbol in pushSymbols:
+                    if pushSymbol == top:
+                        count += 1
+                    else:
+                        runSymbols.append(top)
+                        runCounts.append(count)
+                        below += count
+                        countLimit = maximumDepth - below
+                        top = pushSymbol
+                        count = 1
+                    if count > countLimit:
+                        break
+                if count > countLimit:
+                    break
+        base = moveNext[cell]
+    runSymbols.append(top)
+    runCounts.append(count)
+    del runSymbols[0]
+    del runCounts[0]
+    for position in range(len(runSymbols)):
+        runSymbols[position] //= numSymbols
+    stack.depth = below + count
+    if count > countLimit:
+        raise StackDepthError(f"The stack grew deeper than its maximum depth of {maximumDepth} symbols")
+    return base // stride
+
+def findEpsilonCycles(compiledPDA):
+    # the (state, stack top, cycle) triples whose epsilon closure was cut at a cycle (EPSILON_LOOP or
+    # UNBOUNDED_PUSH), with stack top None for an empty stack - useful to spot epsilon rules that loop forever
+    epsilonCycles = []
+    width = compiledPDA.numStackSymbols + 1
+    for cell, cycle in enumerate(compiledPDA.closureCycle):
+        if cycle != NO_CYCLE:
+            state, stackTop = divmod(cell, width)
+            stackTop = None if stackTop == compiledPDA.numStackSymbols else compiledPDA.stackNames[stackTop]
+            epsilonCycles.append((compiledPDA.stateNames[state], stackTop, cycle))
+    return epsilonCycles
+
+def findDeadStates(stateIndex, rules, accept):
+    # a state is dead if no accept state can be reached from it through the rules (whatever the input
+    # and the stack are) - searching backwards from the accept states finds all the other (live) ones
+    predecessors = [[] for state in stateIndex]
+    for sourceState in rules:
+        for symbol in rules[sourceState]:
+            for rule in rules[sourceState][symbol].values():
+                predecessors[stateIndex[rule["nextState"]]].append(stateIndex[sourceState])
+    live = bytearray(len(stateIndex))
+    toVisit = [stateIndex[acceptState] for acceptState in accept]
+    for state in toVisit:
+        live[state] = 1
+    while toVisit:
+        state = toVisit.pop()
+        for predecessor in predecessors[state]:
+            if not live[predecessor]:
+                live[predecessor] = 1
+                toVisit.append(predecessor)
+    return bytearray(1 - isLive for isLive in live)
+
+class SharedStack:
+    # stack with the list operations CompiledPDA uses (append, pop, [-1] and truth value), stored as an
+    # immutable linked list of (top, rest) pairs - copying it only copies the reference to the top node,
+    # and the copies share everything below their tops (a push or pop never changes an existing node)
+    __slots__ = ("node",)
+
+    def __init__(self, node = None):
+        self.node = node
+
+    def append(self, symbol):
+        self.node = (symbol, self.node)
+
+    def extend(self, symbols):
+        for symbol in symbols:
+            self.node = (symbol, self.node)
+
+    def pop(self):
+        symbol, self.node = self.node
+        return symbol
+
+    def __getitem__(self, index):
+        if index != -1:
+            raise IndexError("Only the top of a SharedStack (index -1) can be read")
+        return self.node[0]
+
+    def __bool__(self):
+        return self.node is not None
+
+    def toList(self):
+        # the stack as a list, bottom first (like the list stack of runPDA)
+        symbols = []
+        node = self.node
+        while node is not None:
+            symbols.append(node[0])
+            node = node[1]
+        symbols.reverse()
+        return symbols
+
+UNLIMITED_DEPTH = 1 << 62 # maximum depth used for a CompactStack without one
+
+class CompactStack:
+    # stack of int codes (the stack symbols of a CompiledPDA) with the list operations CompiledPDA uses
+    # (append, extend, pop, [-1] and truth value), stored run-length encoded in two arrays: the stack is
+    # runSymbols[0] repeated runCounts[0] times, then runSymbols[1] repeated runCounts[1] times, ... (bottom
+    # run first). A run of the same symbol - like the 0s notregular.pda pushes for 0ⁿ - takes 12 bytes
+    # however long it is, instead of a list entry per symbol
+    # maximumDepth - the most symbols the stack may hold, a push that goes over it raises StackDepthError
+    # (the symbol is still pushed, so the stack shows where it happened), None for no limit
+    __slots__ = ("runSymbols", "runCounts", "depth", "maximumDepth")
+
+    def __init__(self, maximumDepth = None):
+        self.runSymbols = array("i")
+        self.runCounts = array("q")
+        self.depth = 0
+        self.maximumDepth = maximumDepth
+
+    def append(self, symbol):
+        if self.runSymbols and self.runSymbols[-1] == symbol:
+            self.runCounts[-1] += 1
+        else:
+            self.runSymbols.append(symbol)
+            self.runCounts.append(1)
+        self.depth += 1
+        if self.maximumDepth is not None and self.depth > self.maximumDepth:
+            raise StackDepthError(f"The stack grew deeper than its maximum depth of {self.maximumDepth} symbols")
+
+    def extend(self, symbols):
+        for symbol in symbols:
+            self.append(symbol)
+
+    def pop(self):
+        symbol = self.runSymbols[-1]
+        if self.runCounts[-1] == 1:
+            self.runSymbols.pop()
+            self.runCounts.pop()
+        else:
+            self.runCounts[-1] -= 1
+        self.depth -= 1
+        return symbol
+
+    def __getitem__(self, index):
+        if index != -1:
+            raise IndexError("Only the top of a CompactStack (index -1) can be read")
+        return self.runSymbols[-1]
+
+    def __bool__(self):
+        return self.depth > 0
+
+    def __len__(self):
+        return self.depth
 
+    def toList(self):
+        # the stack as a list, bottom first (like the list stack of runPDA)
+        symbols = []
+        for symbol, count in zip(self.runSymbols, self.runCounts):
+            symbols.extend([symbol] * count)
+        return symbols
+
+class PDASession:
+    # a run of a PDA that is fed its input symbols as they arrive, instead of running runPDA from scratch
+    # on the whole buffered string every time
+    # feeding the symbols of a string in any number of pieces and then calling isAccepting gives the same
+    # result as runPDA on the whole string
+    # snapshot() is O(1) - it returns the current state and the top node of the (shared) stack - and
+    # restore() goes back to a snapshot, so a session can be checkpointed and rolled back cheaply
+    __slots__ = ("compiledPDA", "state", "stack")
+
+    def __init__(self, PDA):
+        if isinstance(PDA, CompiledPDA):
+            self.compiledPDA = PDA
+        else:
+            self.compiledPDA = compilePDA(PDA)
+        self.stack = SharedStack()
+        self.state = self.compiledPDA.epsilonClosure(self.compiledPDA.start, self.stack)
+
+    def feed(self, symbols, stringSeparator = None):
+        # symbols is an iterable of input symbols, or a string split with stringSeparator when one is given
+        # (a string without a separator is fed character by character, like runPDA does with "")
+        # all symbols are checked against the alphabet first, so an invalid one leaves the session unchanged
+        if stringSeparator is not None:
+            symbols = splitIncludingNoSeparator(symbols.strip(), stringSeparator)
+        symbolIndex = self.compiledPDA.symbolIndex
+        try:
+            symbols = [symbolIndex[symbol] for symbol in symbols]
+        except KeyError:
+            raise InputStringError("Input string contains symbols not in the given alphabet of the PDA")
+        for symbol in symbols:
+            self.state = self.compiledPDA.step(self.state, symbol, self.stack)
+
+    def isAccepting(self):
+        # whether the input fed so far is accepted - the final epsilon closure runs on a copy of the stack,
+        # so more symbols can still be fed afterwards
+        state = self.compiledPDA.epsilonClosure(self.state, SharedStack(self.stack.node))
+        return self.compiledPDA.acceptMask[state] == 1
+
+    def getCurrentState(self):
+        return self.compiledPDA.stateNames[self.state]
+
+    def getStack(self):
+        stackNames = self.compiledPDA.stackNames
+        return [stackNames[symbol] for symbol in self.stack.toList()]
+
+    def snapshot(self):
+        return self.state, self.stack.node
+
+    def restore(self, snapshot):
+        self.state, node = snapshot
+        self.stack = SharedStack(node)
+
+def runCompiledPDA(compiledPDA, inputString, stringSeparator, printPDASteps = True, trace = None, stack = None):
+    # fast path of runPDA, same results as running the PDA tuple it was compiled from
+    # trace - TraceRecorder (see PDATrace.py) every move of the run is recorded to, None to run untraced
+    # stack - empty stack object the run uses (and leaves as the run ended), a list by default - pass a
+    # CompactStack for deep stacks, or to stop runs that go over a maximum depth
+    # untraced runs that don't print their steps stop reading the symbols once the PDA is in a dead state
+    # (see CompiledPDA), the stack is left as it was there
+    symbolIndex = compiledPDA.symbolIndex
+    inputString = inputString.strip()
+    try:
+        # looking every symbol up once both validates the input string and translates it to codes
+        symbols = [symbolIndex[symbol] for symbol in splitIncludingNoSeparator(inputString, stringSeparator)]
+    except KeyError:
+        raise InputStringError("Input string contains symbols not in the given alphabet of the PDA")
+
+    if stack is None:
+        stack = []
+    currentState = compiledPDA.start
+    stateNames = compiledPDA.stateNames
+    if printPDASteps == True:
+        print(stateNames[currentState])
+    currentState = compiledPDA.epsilonClosure(currentState, stack, trace)
+
+    if trace is not None:
+        # a separate loop, so untraced runs don't pay for a check per symbol
+        symbolNames = compiledPDA.symbolNames
+        for step, currentSymbol in enumerate(symbols, start = 1):
+            if printPDASteps == True:
+                print(symbolNames[currentSymbol])
+            currentState = compiledPDA.tracedStep(currentState, currentSymbol, stack, trace, step)
+            if printPDASteps == True:
+                print(stateNames[currentState])
+    elif printPDASteps == True:
+        symbolNames = compiledPDA.symbolNames
+        for currentSymbol in symbols:
+            print(symbolNames[currentSymbol])
+            currentState = compiledPDA.step(currentState, currentSymbol, stack)
+            print(stateNames[currentState])
+    elif compiledPDA.deterministic and type(stack) is list:
+        currentState = runMoves(compiledPDA, currentState, symbols, stack)
+    elif compiledPDA.deterministic and type(stack) is CompactStack:
+        currentState = runCompactMoves(compiledPDA, currentState, symbols, stack)
+    else:
+        # step() inlined - this loop runs once per input symbol
+        width = compiledPDA.numSymbols + 1
+        numStackSymbols = compiledPDA.numStackSymbols
+        noPopNext = compiledPDA.noPopNext
+        noPopPush = compiledPDA.noPopPush
+        popNext = compiledPDA.popNext
+        popPush = compiledPDA.popPush
+        pushStrings = compiledPDA.pushStrings
+        deadMask = compiledPDA.deadMask
+        for currentSymbol in symbols:
+            if deadMask[currentState]:
+                break # the input string is rejected whatever symbols follow
+            row = currentState * width + currentSymbol
+            nextState = noPopNext[row]
+            if nextState != NO_RULE:
+                pushSymbol = noPopPush[row]
+                if pushSymbol >= 0:
+                    stack.append(pushSymbol)
+                elif pushSymbol != NO_RULE:
+                    stack.extend(pushStrings[PUSH_STRING - pushSymbol])
+                currentState = nextState
+            elif stack:
+                cell = row * numStackSymbols + stack[-1]
+                nextState = popNext[cell]
+                if nextState != NO_RULE:
+                    stack.pop()
+                    pushSymbol = popPush[cell]
+                    if pushSymbol >= 0:
+                        stack.append(pushSymbol)
+                    elif pushSymbol != NO_RULE:
+                        stack.extend(pushStrings[PUSH_STRING - pushSymbol])
+                    currentState = nextState
+
+    stateBeforeEpsilon = currentState
+    currentState = compiledPDA.epsilonClosure(currentState, stack, trace, len(symbols))
+    if stateBeforeEpsilon != currentState and printPDASteps == True:
+        print(stateNames[currentState])
+    if trace is not None:
+        trace.finish(currentState, compiledPDA.acceptMask[currentState] == 1)
+    return compiledPDA.acceptMask[currentState] == 1
+
+def runPDA(PDA, inputString, stringSeparator, printPDASteps = True, trace = None, stack = None):
+    # trace - TraceRecorder (see PDATrace.py) to record every move of the run to - traced runs always take
+    # the compiled path, the trace records the int codes of its tables
+    # stack - empty stack object for the run, e.g. a CompactStack (see runCompiledPDA) - the compiled path
+    # is taken as well, the stack holds the int codes of its stack symbols
+    if isinstance(PDA, CompiledPDA):
+        return runCompiledPDA(PDA, inputString, stringSeparator, printPDASteps, trace, stack)
+    if trace is not None or stack is not None:
+        return runCompiledPDA(compilePDA(PDA), inputString, stringSeparator, printPDASteps, trace, stack)
+    if isinstance(PDA, ValidatedPDA):
+        compiled = compilePDA(PDA) # kept on the PDA (or loaded from a cache), only the first run compiles it
+        if compiled.deterministic:
+            # the move table of a deterministic PDA is a tight loop with no alternatives to branch over
+            return runCompiledPDA(compiled, inputString, stringSeparator, printPDASteps)
+    return runPDARules(PDA, inputString, stringSeparator, printPDASteps)
+
+def runPDARules(PDA, inputString, stringSeparator, printPDASteps = True):
+    # runs the PDA by walking its rules dict (getNextState and epsilon moves), without compiling it - what
+    # runPDA does for a plain tuple and for a nondeterministic PDA
     states, sigma, stackSigma, rules, start, accept = PDA # getting values from 5-tuple
     stack = []
     # could check if the PDA is valid before running it, but the runPDA function should return an error
     # string instead of just False, because False might be misinterpreted as last state of the PDA is not
     # an accept state
-    # but PDA validity is also looked upon when processing the file
-    # if the functions are arranged in different files/modules, code like this is preferrable
-    if not isPDAValid(PDA):
+    # a ValidatedPDA (returned by parseFile/freezePDA) was already checked, so only plain tuples built
+    # by hand are validated here
+    if isinstance(PDA, ValidatedPDA):
+        sigma = PDA.sigmaSet # O(1) membership checks for isStringValid and the accept check
+        accept = PDA.acceptSet
+    elif not isPDAValid(PDA):
         raise PDAError("PDA not valid")
     
     inputString = inputString.strip() # removes whitespace, \n, from left and right
@@ -401,6 +1333,120 @@ def runPDA(PDA, inputString, stringSeparator, printPDASteps = True):
         return True            # of the PDA, if it is valid return true
     else:
         return False
-    
-        
-        
\ No newline at end of file
+
+def runPDABatch(PDA, inputStrings, stringSeparator, printPDASteps = False):
+    # runs the same PDA over many input strings and returns one accept/reject result (True/False) per string,
+    # in the same order as the input strings
+    # the PDA is validated and compiled only once, and its lookup tables are reused for every string
+    if isinstance(PDA, CompiledPDA):
+        compiledPDA = PDA
+    else:
+        compiledPDA = compilePDA(PDA)
+    return [runCompiledPDA(compiledPDA, inputString, stringSeparator, printPDASteps) for inputString in inputStrings]
+
+# state of a worker process of runPDAParallel - the compiled PDA is sent to every worker once, when the
+# pool starts it, instead of being pickled together with every chunk of input strings
+workerPDA = None
+workerSeparator = None
+
+def initialiseWorker(compiledPDA, stringSeparator):
+    global workerPDA, workerSeparator
+    workerPDA = compiledPDA
+    workerSeparator = stringSeparator
+
+def runInWorker(inputString):
+    return runCompiledPDA(workerPDA, inputString, workerSeparator, False)
+
+def runPDAParallel(PDA, inputStrings, stringSeparator, jobs = None, chunkSize = 256):
+    # same results as runPDABatch (in input order), with the input strings spread over jobs worker
+    # processes (all CPU cores if jobs is None), chunkSize input strings at a time
+    if isinstance(PDA, CompiledPDA):
+        compiledPDA = PDA
+    else:
+        compiledPDA = compilePDA(PDA)
+    if jobs == 1:
+        return runPDABatch(compiledPDA, inputStrings, stringSeparator)
+    with multiprocessing.Pool(jobs, initializer = initialiseWorker, initargs = (compiledPDA, stringSeparator)) as pool:
+        return pool.map(runInWorker, inputStrings, chunkSize)
+
+def tokenizeStream(inputFile, stringSeparator, chunkSize = 65536):
+    # yields the symbols of an input file (or stdin) one at a time, reading chunkSize characters at a time
+    # gives the same symbols as splitIncludingNoSeparator(inputFile.read().strip(), stringSeparator),
+    # without ever holding more than a chunk and the current symbol in memory
+    started = False # whitespace at the start of the input is skipped, like strip() does
+    pendingWhitespace = "" # whitespace is held back until we know it isn't at the end of the input
+    unfinishedSymbol = "" # text after the last separator, the symbol may continue in the next chunk
+    while True:
+        chunk = inputFile.read(chunkSize)
+        if not chunk:
+            break
+        if not started:
+            chunk = chunk.lstrip()
+            if not chunk:
+                continue
+            started = True
+        text = chunk.rstrip()
+        if not text:
+            pendingWhitespace += chunk
+            continue
+        text = pendingWhitespace + text
+        pendingWhitespace = chunk[len(chunk.rstrip()):]
+        if stringSeparator == "":
+            yield from text # every character is a symbol
+        else:
+            symbols = (unfinishedSymbol + text).split(stringSeparator)
+            unfinishedSymbol = symbols.pop()
+            yield from symbols
+    if stringSeparator != "":
+        yield unfinishedSymbol # "".split(separator) == [""], so an empty input still gives one (empty) symbol
+
+def runPDAStream(PDA, inputFile, stringSeparator, printPDASteps = False, stopAtDeadState = True, chunkSize = 65536, trace = None, stack = None):
+    # runs the PDA over an input file (or stdin) without reading it all into memory
+    # every symbol is checked against the alphabet as it arrives and the PDA advances one symbol at a time,
+    # so memory is bounded by the stack, not by the input size
+    # with stopAtDeadState, reading stops as soon as the PDA is in a dead state (no accept state can be
+    # reached anymore) - the rest of the input isn't read, or checked against the alphabet
+    # trace - TraceRecorder (see PDATrace.py) every move is recorded to, like in runCompiledPDA
+    # stack - empty stack object for the run, like in runCompiledPDA
+    if isinstance(PDA, CompiledPDA):
+        compiledPDA = PDA
+    else:
+        compiledPDA = compilePDA(PDA)
+    symbolIndex = compiledPDA.symbolIndex
+    stateNames = compiledPDA.stateNames
+    symbolNames = compiledPDA.symbolNames
+    deadMask = compiledPDA.deadMask
+
+    if stack is None:
+        stack = []
+    currentState = compiledPDA.start
+    if printPDASteps == True:
+        print(stateNames[currentState])
+    currentState = compiledPDA.epsilonClosure(currentState, stack, trace)
+
+    step = 0
+    for symbol in tokenizeStream(inputFile, stringSeparator, chunkSize):
+        if stopAtDeadState and deadMask[currentState]:
+            if trace is not None:
+                trace.finish(currentState, False)
+            return False
+        currentSymbol = symbolIndex.get(symbol)
+        if currentSymbol is None:
+            raise InputStringError("Input string contains symbols not in the given alphabet of the PDA")
+        if printPDASteps == True:
+            print(symbolNames[currentSymbol])
+        step += 1
+        if trace is None:
+            currentState = compiledPDA.step(currentState, currentSymbol, stack)
+        else:
+            currentState = compiledPDA.tracedStep(currentState, currentSymbol, stack, trace, step)
+        if printPDASteps == True:
+            print(stateNames[currentState])
+
+    stateBeforeEpsilon = currentState
+    currentState = compiledPDA.epsilonClosure(currentState, stack, trace, step)
+    if stateBeforeEpsilon != currentState and printPDASteps == True:
+        print(stateNames[currentState])
+    if trace is not None:
+        trace.finish(currentState, compiledPDA.acceptMask[currentState] == 1)
+    return compiledPDA.acceptMask[currentState] == 1
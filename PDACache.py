@@ -0,0 +1,120 @@
+# binary cache of parsed PDA definitions
+# parsing a .pda file (comments, sections, fixUtf8Corruption on every field) and compiling it (tables and
+# epsilon closures) is repeated on every run of emulatePDA.py, which for large machines takes longer than
+# running them. loadPDA keeps the result in a .pdac file next to the definition:
+#     notregular.pda  ->  notregular.pdac
+# the file starts with a header (CACHE_MAGIC and the key), followed by the marshalled PDA tuple, its rule
+# list and the tables of its CompiledPDA. The key is a hash of the contents of the .pda file (plus the cache
+# format and the Python version, since marshal and the array byte order depend on them), so the cache is
+# rebuilt automatically whenever the definition changes - timestamps aren't trusted
+# a cache file is read with a single mmap of the whole file, and one marshal.loads builds every object in it
+import PDA as automaton
+from array import array
+import hashlib
+import io
+import marshal
+import mmap
+import os
+import sys
+
+CACHE_MAGIC = b"PDAC"
+CACHE_FORMAT = 5 # bump when the payload layout (or CompiledPDA, or what parseFile returns) changes, older cache files are then rebuilt
+CACHE_EXTENSION = ".pdac"
+KEY_SIZE = hashlib.sha256().digest_size
+HEADER_SIZE = len(CACHE_MAGIC) + KEY_SIZE
+
+# CompiledPDA slots stored in the cache - the name -> code dicts aren't, they are rebuilt from the names lists
+ARRAY_SLOTS = ("noPopNext", "noPopPush", "popNext", "popPush", "closureNext", "moveNext", "movePush") # array("i") tables
+BYTEARRAY_SLOTS = ("acceptMask", "deadMask", "closurePop", "closureContinues", "closureCycle", "moveAction")
+PLAIN_SLOTS = ("stateNames", "symbolNames", "stackNames", "numSymbols", "numStackSymbols", "start", "closurePush", "deterministic",
+               "pushStrings", "movePushStrings")
+
+def cachePath(PDAPath):
+    # notregular.pda -> notregular.pdac, other names get the extension appended (machine.txt -> machine.txt.pdac)
+    root, extension = os.path.splitext(PDAPath)
+    if extension == ".pda":
+        return root + CACHE_EXTENSION
+    return PDAPath + CACHE_EXTENSION
+
+def cacheKey(definitionBytes):
+    keyHash = hashlib.sha256()
+    keyHash.update(f"{CACHE_FORMAT} {sys.version_info[0]}.{sys.version_info[1]} {sys.byteorder}\n".encode())
+    keyHash.update(definitionBytes)
+    return keyHash.digest()
+
+def packCompiledPDA(compiledPDA):
+    # the CompiledPDA as a tuple marshal can serialise (arrays and bytearrays as bytes)
+    return (tuple(getattr(compiledPDA, slot) for slot in PLAIN_SLOTS)
+            + tuple(getattr(compiledPDA, slot).tobytes() for slot in ARRAY_SLOTS)
+            + tuple(bytes(getattr(compiledPDA, slot)) for slot in BYTEARRAY_SLOTS))
+
+def unpackCompiledPDA(packed):
+    compiledPDA = automaton.CompiledPDA()
+    position = 0
+    for slot in PLAIN_SLOTS:
+        setattr(compiledPDA, slot, packed[position])
+        position += 1
+    for slot in ARRAY_SLOTS:
+        table = array("i")
+        table.frombytes(packed[position])
+        setattr(compiledPDA, slot, table)
+        position += 1
+    for slot in BYTEARRAY_SLOTS:
+        setattr(compiledPDA, slot, bytearray(packed[position]))
+        position += 1
+    compiledPDA.stateIndex = {name : code for code, name in enumerate(compiledPDA.stateNames)}
+    compiledPDA.symbolIndex = {name : code for code, name in enumerate(compiledPDA.symbolNames)}
+    compiledPDA.stackIndex = {name : code for code, name in enumerate(compiledPDA.stackNames)}
+    return compiledPDA
+
+def readCache(cacheFilePath, key):
+    # the ValidatedPDA stored in the cache file (with its compiledPDA filled in), or None if there is no
+    # cache file, it was built from a different definition, or it can't be read
+    try:
+        with open(cacheFilePath, "rb") as cacheFile:
+            with mmap.mmap(cacheFile.fileno(), 0, access = mmap.ACCESS_READ) as cacheMap:
+                if cacheMap[:HEADER_SIZE] != CACHE_MAGIC + key:
+                    return None
+                with memoryview(cacheMap) as cacheView:
+                    payload = marshal.loads(cacheView[HEADER_SIZE:])
+    except (OSError, ValueError, EOFError, TypeError):
+        return None # missing, empty (mmap can't map 0 bytes) or truncated cache files are rebuilt
+
+    states, sigma, stackSigma, rules, start, accept, ruleList, packedCompiledPDA = payload
+    PDA = automaton.ValidatedPDA((states, sigma, stackSigma, rules, start, accept), ruleList)
+    PDA.compiledPDA = unpackCompiledPDA(packedCompiledPDA)
+    return PDA
+
+def writeCache(cacheFilePath, key, PDA):
+    # the cache is written to a temporary file first and renamed over the old one, so a run that reads it
+    # at the same time never sees half a file. A cache that can't be written (read-only folder) is skipped
+    states, sigma, stackSigma, rules, start, accept = PDA
+    payload = (states, sigma, stackSigma, rules, start, accept, PDA.ruleList, packCompiledPDA(automaton.compilePDA(PDA)))
+    temporaryPath = f"{cacheFilePath}.{os.getpid()}.tmp"
+    try:
+        with open(temporaryPath, "wb") as cacheFile:
+            cacheFile.write(CACHE_MAGIC + key)
+            cacheFile.write(marshal.dumps(payload))
+        os.replace(temporaryPath, cacheFilePath)
+    except OSError:
+        try:
+            os.remove(temporaryPath)
+        except OSError:
+            pass
+
+def loadPDA(PDAPath, useCache = True):
+    # parseFile for a .pda file given by its path, through the cache - returns the same ValidatedPDA, with
+    # its compiledPDA already built, so compilePDA on it costs nothing
+    with open(PDAPath, "rb") as PDAFile:
+        definitionBytes = PDAFile.read()
+    key = cacheKey(definitionBytes)
+    if useCache:
+        PDA = readCache(cachePath(PDAPath), key)
+        if PDA is not None:
+            return PDA
+
+    # parseFile decodes the lines of a binary file itself (see decodeDefinitionLine)
+    PDA = automaton.parseFile(io.BytesIO(definitionBytes))
+    if useCache:
+        writeCache(cachePath(PDAPath), key, PDA)
+    return PDA
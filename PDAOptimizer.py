@@ -0,0 +1,293 @@
+# static optimizer for PDA definitions
+# optimizePDA takes a parsed (or hand built) PDA and returns a smaller machine in the same tuple format,
+# equivalent under runPDA - it accepts and rejects exactly the same input strings (and raises the same
+# InputStringError for symbols outside the alphabet, the alphabets are kept as they are). The passes:
+# - unreachable states: states no rule leads to from the start state are removed, with their rules
+# - trap states: states from which no accept state can be reached (like qd in notregular.pda) whatever the
+#   input is - their rules are removed, the PDA rejects once it is in one of them anyway. The engine stops
+#   early in them with or without this pass (compilePDA marks them in deadMask, and the compiled runs stop
+#   reading the input there) - removing their rules only makes the machine smaller
+# - dead rules: rules runPDA never takes - the nondeterministic alternatives the rules dict doesn't keep,
+#   rules popping a stack symbol nothing ever pushes, rules popping the top that are hidden by a rule on
+#   the same input symbol that doesn't pop (getNextState takes that one first), and rules that leave the
+#   state and the stack as they are (staying is what happens when no rule matches)
+# - epsilon chains: an intermediate state that is only entered through epsilon rules and whose only rule
+#   is one epsilon rule is skipped, by combining the stack operations of the two rules into one, when the
+#   result still pops at most one symbol (two pushes become one push string, a push followed by a pop of
+#   the same symbol cancels out)
+# - equivalent states: states with the same rules (up to the states they lead to, which have to be
+#   equivalent too) that are both accepting or both not accepting are merged
+# epsilon moves are cut when they go around a cycle (see followEpsilonMoves), and skipping or merging states
+# on a cycle would change where they are cut - states on a cycle of epsilon rules are never skipped or merged
+# the result is meant for runPDA: nondeterministic alternatives are dropped, so NPDA.runNPDA can accept
+# more strings on the original machine than on the optimized one
+import PDA as automaton
+
+class OptimizationReport:
+    __slots__ = ("statesBefore", "statesAfter", "rulesBefore", "rulesAfter", "unreachableStates", "trapStates",
+                 "removedRules", "collapsedStates", "mergedStates")
+
+    def __init__(self):
+        self.statesBefore = self.statesAfter = self.rulesBefore = self.rulesAfter = 0
+        self.unreachableStates = []
+        self.trapStates = []
+        self.removedRules = [] # (rule, reason), rule as (sourceState, symbol, popSymbol, pushSymbol, destinationState)
+        self.collapsedStates = [] # epsilon chain states that were skipped
+        self.mergedStates = {} # kept state -> the states merged into it
+
+    def report(self):
+        lines = [
+            f"states: {self.statesBefore} -> {self.statesAfter}",
+            f"rules: {self.rulesBefore} -> {self.rulesAfter}",
+            f"unreachable states removed: {', '.join(self.unreachableStates) or 'none'}",
+            f"trap states (no accept state reachable): {', '.join(self.trapStates) or 'none'}",
+            f"epsilon chain states skipped: {', '.join(self.collapsedStates) or 'none'}"
+        ]
+        for keptState, mergedStates in self.mergedStates.items():
+            lines.append(f"merged into {keptState}: {', '.join(mergedStates)}")
+        if self.removedRules:
+            lines.append("removed rules:")
+            for rule, reason in self.removedRules:
+                lines.append(f"    {', '.join(rule)}   ({reason})")
+        return "\n".join(lines)
+
+def ruleTuples(rules):
+    return automaton.listRules(rules)
+
+def buildRules(ruleList):
+    rules = {}
+    for sourceState, symbol, popSymbol, pushSymbol, destinationState in ruleList:
+        rules.setdefault(sourceState, {}).setdefault(symbol, {})[popSymbol] = {
+            "push" : pushSymbol,
+            "nextState" : destinationState
+        }
+    return rules
+
+def reachableStates(start, ruleList):
+    successors = {}
+    for sourceState, symbol, popSymbol, pushSymbol, destinationState in ruleList:
+        successors.setdefault(sourceState, []).append(destinationState)
+    reached = {start}
+    toVisit = [start]
+    while toVisit:
+        for nextState in successors.get(toVisit.pop(), ()):
+            if nextState not in reached:
+                reached.add(nextState)
+                toVisit.append(nextState)
+    return reached
+
+def epsilonCycleStates(ruleList):
+    # the states on a cycle of epsilon rules (strongly connected components with more than one state,
+    # or a state with an epsilon rule to itself) - iterative Tarjan, generated machines can be large
+    successors = {}
+    for sourceState, symbol, popSymbol, pushSymbol, destinationState in ruleList:
+        if symbol == "epsilon":
+            successors.setdefault(sourceState, []).append(destinationState)
+    index = {}
+    lowLink = {}
+    onStack = set()
+    componentStack = []
+    onCycle = set()
+    for root in successors:
+        if root in index:
+            continue
+        work = [(root, iter(successors.get(root, ())))]
+        index[root] = lowLink[root] = len(index)
+        componentStack.append(root)
+        onStack.add(root)
+        while work:
+            state, children = work[-1]
+            child = next(children, None)
+            if child is not None:
+                if child not in index:
+                    index[child] = lowLink[child] = len(index)
+                    componentStack.append(child)
+                    onStack.add(child)
+                    work.append((child, iter(successors.get(child, ()))))
+                elif child in onStack:
+                    lowLink[state] = min(lowLink[state], index[child])
+                continue
+            work.pop()
+            if work:
+                parent = work[-1][0]
+                lowLink[parent] = min(lowLink[parent], lowLink[state])
+            if lowLink[state] == index[state]:
+                component = []
+                while True:
+                    member = componentStack.pop()
+                    onStack.discard(member)
+                    component.append(member)
+                    if member == state:
+                        break
+                if len(component) > 1 or state in successors.get(state, ()):
+                    onCycle.update(component)
+    return onCycle
+
+def combineRules(firstRule, secondRule):
+    # one epsilon rule doing what firstRule followed by secondRule does, or None if it would have to pop
+    # more than one symbol
+    sourceState, symbol, firstPop, firstPush, middleState = firstRule
+    middleState, symbol, secondPop, secondPush, destinationState = secondRule
+    # the push strings as lists of symbols, top first (see automaton.splitPush)
+    firstSymbols = [] if firstPush == "epsilon" else firstPush.split()
+    secondSymbols = [] if secondPush == "epsilon" else secondPush.split()
+    if secondPop != "epsilon":
+        if not firstSymbols or firstSymbols[0] != secondPop:
+            return None # the second rule pops a symbol the first one didn't push - it depends on the stack below
+        firstSymbols = firstSymbols[1:] # the push and the pop cancel out
+    pushSymbol = " ".join(secondSymbols + firstSymbols) or "epsilon"
+    return sourceState, "epsilon", firstPop, pushSymbol, destinationState
+
+def isNoOpRule(rule, rules):
+    # a rule that leaves the state and the stack as they are - the same as no rule matching, as long as
+    # removing it doesn't let another rule take its place
+    sourceState, symbol, popSymbol, pushSymbol, destinationState = rule
+    if sourceState != destinationState or popSymbol != pushSymbol:
+        return False
+    if symbol != "epsilon":
+        return True # the rules it hides (same symbol, popping the top) are dead rules removed separately
+    # epsilon rules popping the top have priority over the one that doesn't pop - removing a no-op popping
+    # rule would let that one apply instead
+    return popSymbol == "epsilon" or "epsilon" not in rules[sourceState]["epsilon"]
+
+def removeDeadRules(ruleList, rules, report):
+    # one round of dead rule removal, returns the rules that are kept
+    pushedSymbols = {pushedSymbol for sourceState, symbol, popSymbol, pushSymbol, destinationState in ruleList
+                     for pushedSymbol in pushSymbol.split()}
+    keptRules = []
+    for rule in ruleList:
+        sourceState, symbol, popSymbol, pushSymbol, destinationState = rule
+        if popSymbol != "epsilon" and popSymbol not in pushedSymbols:
+            report.removedRules.append((rule, f"nothing pushes {popSymbol}"))
+        elif symbol != "epsilon" and popSymbol != "epsilon" and "epsilon" in rules[sourceState][symbol]:
+            report.removedRules.append((rule, "hidden by the rule that doesn't pop"))
+        elif isNoOpRule(rule, rules):
+            report.removedRules.append((rule, "changes nothing"))
+        else:
+            keptRules.append(rule)
+    return keptRules
+
+def collapseEpsilonChains(ruleList, start, accept, report):
+    # skips epsilon chain states (see the top of the file), one state at a time until none is left
+    while True:
+        rulesFrom = {}
+        rulesInto = {}
+        for rule in ruleList:
+            rulesFrom.setdefault(rule[0], []).append(rule)
+            rulesInto.setdefault(rule[4], []).append(rule)
+        onCycle = epsilonCycleStates(ruleList)
+        collapsed = False
+        for middleState, outgoingRules in rulesFrom.items():
+            if (middleState == start or middleState in accept or middleState in onCycle or len(outgoingRules) != 1
+                    or outgoingRules[0][1] != "epsilon"
+                    or any(rule[1] != "epsilon" for rule in rulesInto.get(middleState, ()))):
+                continue
+            combinedRules = {}
+            for rule in rulesInto.get(middleState, ()):
+                combinedRule = combineRules(rule, outgoingRules[0])
+                if combinedRule is not None:
+                    combinedRules[rule] = combinedRule
+            if not combinedRules:
+                continue
+            ruleList = [combinedRules.get(rule, rule) for rule in ruleList]
+            report.collapsedStates.append(middleState)
+            collapsed = True
+            break # the rule maps are out of date now
+        if not collapsed:
+            return ruleList
+
+def mergeEquivalentStates(states, ruleList, start, accept, report):
+    # partition refinement: states start in two blocks (accepting or not, states on epsilon cycles alone),
+    # and blocks are split until every state of a block has the same rules into the same blocks
+    rules = buildRules(ruleList)
+    onCycle = epsilonCycleStates(ruleList)
+    acceptSet = set(accept)
+    block = {state : (state in acceptSet, state if state in onCycle else None) for state in states}
+    blockCount = len(set(block.values()))
+    while True:
+        signatures = {}
+        for state in states:
+            transitions = frozenset((symbol, popSymbol, rule["push"], block[rule["nextState"]])
+                                    for symbol in rules.get(state, {})
+                                    for popSymbol, rule in rules[state][symbol].items())
+            signatures[state] = (block[state], transitions)
+        newBlockCount = len(set(signatures.values()))
+        block = signatures
+        if newBlockCount == blockCount:
+            break
+        blockCount = newBlockCount
+
+    representative = {} # block -> kept state (the start state if it's in the block, else the first one)
+    for state in states:
+        if state == start or block[state] not in representative:
+            if block[state] in representative and state == start:
+                oldRepresentative = representative[block[state]]
+                representative[block[state]] = start
+                report.mergedStates[start] = report.mergedStates.pop(oldRepresentative, []) + [oldRepresentative]
+            else:
+                representative[block[state]] = state
+            continue
+        report.mergedStates.setdefault(representative[block[state]], []).append(state)
+    keptStates = [state for state in states if representative[block[state]] == state]
+    mergedRules = {}
+    for sourceState, symbol, popSymbol, pushSymbol, destinationState in ruleList:
+        if representative[block[sourceState]] == sourceState:
+            mergedRules[(sourceState, symbol, popSymbol)] = (sourceState, symbol, popSymbol, pushSymbol,
+                                                              representative[block[destinationState]])
+    mergedAccept = [state for state in accept if state in keptStates]
+    return keptStates, list(mergedRules.values()), mergedAccept
+
+def optimizePDA(PDA):
+    # returns (optimizedPDA, report) - optimizedPDA is a ValidatedPDA like parseFile returns
+    PDA = automaton.freezePDA(PDA)
+    states, sigma, stackSigma, rules, start, accept = PDA
+    report = OptimizationReport()
+    report.statesBefore = len(states)
+    report.rulesBefore = len(automaton.getRuleList(PDA))
+
+    # the rules dict holds the rules runPDA takes, the other alternatives are dead
+    ruleList = ruleTuples(rules)
+    keptRules = set(ruleList)
+    for rule in automaton.getRuleList(PDA):
+        if rule not in keptRules:
+            report.removedRules.append((rule, "alternative runPDA never takes"))
+
+    stateIndex = {state : index for index, state in enumerate(states)}
+    deadMask = automaton.findDeadStates(stateIndex, rules, accept)
+    report.trapStates = [state for state in states if deadMask[stateIndex[state]]]
+    trapStates = set(report.trapStates)
+    for rule in ruleList:
+        if rule[0] in trapStates:
+            report.removedRules.append((rule, "from a trap state"))
+    ruleList = [rule for rule in ruleList if rule[0] not in trapStates]
+
+    while True:
+        reached = reachableStates(start, ruleList)
+        for rule in ruleList:
+            if rule[0] not in reached:
+                report.removedRules.append((rule, "from an unreachable state"))
+        ruleList = [rule for rule in ruleList if rule[0] in reached]
+        previousLength = len(ruleList)
+        ruleList = removeDeadRules(ruleList, buildRules(ruleList), report)
+        ruleList = collapseEpsilonChains(ruleList, start, accept, report)
+        if len(ruleList) == previousLength and len(reachableStates(start, ruleList)) == len(reached):
+            break
+
+    reached = reachableStates(start, ruleList)
+    report.unreachableStates = [state for state in states if state not in reached]
+    keptStates = [state for state in states if state in reached]
+    keptAccept = [state for state in accept if state in reached]
+    if not keptAccept:
+        # no accept state can be reached, every input is rejected - one (unreachable) accept state is kept
+        # so the machine stays valid
+        keptStates.append(accept[0])
+        keptAccept = [accept[0]]
+        report.unreachableStates.remove(accept[0])
+    keptStates, ruleList, keptAccept = mergeEquivalentStates(keptStates, ruleList, start, keptAccept, report)
+
+    optimizedPDA = keptStates, list(sigma), list(stackSigma), buildRules(ruleList), start, keptAccept
+    if not automaton.isPDAValid(optimizedPDA, ruleList):
+        raise automaton.PDAError("PDA not valid")
+    report.statesAfter = len(keptStates)
+    report.rulesAfter = len(ruleList)
+    return automaton.ValidatedPDA(optimizedPDA, ruleList), report
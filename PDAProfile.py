@@ -0,0 +1,149 @@
+# profiling of PDA runs
+# profilePDA runs the PDA like runPDA does (getNextState and epsilon moves on the rules dict) and collects
+# in a PDAStats object:
+# - how many times every rule of the rules dict fired (rules nothing ever fired are dead on that traffic)
+# - how many times getNextState found no rule and the PDA stayed in the same state
+# - the maximum stack depth
+# - the time spent validating the PDA, tokenizing the input string and simulating the PDA
+# it is a separate, instrumented copy of the run loop - runPDA itself isn't changed, so runs that aren't
+# profiled don't pay anything for it. The same PDAStats can be passed to many profilePDA calls to add up
+# the numbers over a whole batch of input strings
+import PDA as automaton
+import time
+
+class PDAStats:
+    __slots__ = ("PDA", "ruleHits", "noRuleCount", "maximumStackDepth", "validationSeconds",
+                 "tokenizationSeconds", "simulationSeconds", "runs", "acceptedRuns", "symbols", "lastAccepted")
+
+    def __init__(self, PDA):
+        self.PDA = automaton.freezePDA(PDA)
+        # (sourceState, symbol, popSymbol) -> times the rule fired, for every rule in the rules dict
+        self.ruleHits = {(sourceState, symbol, popSymbol) : 0
+                         for sourceState, symbol, popSymbol, pushSymbol, destinationState in automaton.listRules(self.PDA[3])}
+        self.noRuleCount = 0
+        self.maximumStackDepth = 0
+        self.validationSeconds = 0.0
+        self.tokenizationSeconds = 0.0
+        self.simulationSeconds = 0.0
+        self.runs = 0
+        self.acceptedRuns = 0
+        self.symbols = 0
+        self.lastAccepted = None # result of the last profiled run
+
+    def deadRules(self):
+        # the rules that never fired, as (sourceState, symbol, popSymbol, pushSymbol, destinationState)
+        rules = self.PDA[3]
+        return [(sourceState, symbol, popSymbol, rules[sourceState][symbol][popSymbol]["push"],
+                 rules[sourceState][symbol][popSymbol]["nextState"])
+                for (sourceState, symbol, popSymbol), hits in self.ruleHits.items() if hits == 0]
+
+    def asDict(self):
+        # the stats as plain data, e.g. for json.dumps
+        rules = self.PDA[3]
+        return {
+            "runs" : self.runs,
+            "acceptedRuns" : self.acceptedRuns,
+            "symbols" : self.symbols,
+            "validationSeconds" : self.validationSeconds,
+            "tokenizationSeconds" : self.tokenizationSeconds,
+            "simulationSeconds" : self.simulationSeconds,
+            "maximumStackDepth" : self.maximumStackDepth,
+            "noRuleCount" : self.noRuleCount,
+            "ruleHits" : [{"rule" : [sourceState, symbol, popSymbol, rules[sourceState][symbol][popSymbol]["push"],
+                                     rules[sourceState][symbol][popSymbol]["nextState"]], "hits" : hits}
+                          for (sourceState, symbol, popSymbol), hits in self.ruleHits.items()]
+        }
+
+    def report(self):
+        # the stats as text, rules sorted from the most to the least used
+        rules = self.PDA[3]
+        lines = [
+            f"runs: {self.runs} ({self.acceptedRuns} accepted), {self.symbols} input symbols",
+            f"time: validation {self.validationSeconds:.6f} s, tokenization {self.tokenizationSeconds:.6f} s, simulation {self.simulationSeconds:.6f} s",
+            f"maximum stack depth: {self.maximumStackDepth}",
+            f"no rule matched (stayed in the same state): {self.noRuleCount} times",
+            "rule hits:"
+        ]
+        for (sourceState, symbol, popSymbol), hits in sorted(self.ruleHits.items(), key = lambda item: -item[1]):
+            rule = rules[sourceState][symbol][popSymbol]
+            line = f"{hits:>12}  {sourceState}, {symbol}, {popSymbol}, {rule['push']}, {rule['nextState']}"
+            lines.append(line + ("   (never fired)" if hits == 0 else ""))
+        return "\n".join(lines)
+
+def matchingRule(currentState, currentSymbol, rules, stack):
+    # the (sourceState, symbol, popSymbol) key of the rule getNextState takes, or None if it takes none
+    # (same priorities - a rule that doesn't pop comes first, then the one popping the stack top)
+    if currentState not in rules or currentSymbol not in rules[currentState]:
+        return None
+    symbolRules = rules[currentState][currentSymbol]
+    if "epsilon" in symbolRules:
+        return currentState, currentSymbol, "epsilon"
+    if stack and stack[-1] in symbolRules:
+        return currentState, currentSymbol, stack[-1]
+    return None
+
+def profiledEpsilonClosure(currentState, rules, stack, stats):
+    # epsilonClosure, counting the epsilon rules it follows
+    while True:
+        stackTop = stack[-1] if stack else None
+        movesFound = []
+        def findMove(state, stackTop):
+            move = automaton.epsilonMove(state, rules, stackTop)
+            if move is not None:
+                movesFound.append((state, "epsilon", stackTop if move[0] else "epsilon"))
+            return move
+        currentState, pops, pushSymbols, continues, cycle = automaton.followEpsilonMoves(currentState, stackTop, findMove)
+        if cycle != automaton.NO_CYCLE:
+            movesFound.pop() # the walk stopped before the move that would have closed the cycle
+        for rule in movesFound:
+            stats.ruleHits[rule] += 1
+        if pops:
+            stack.pop()
+        stack.extend(pushSymbols)
+        # the walk can push and pop several symbols, only the height it ends at is seen here
+        stats.maximumStackDepth = max(stats.maximumStackDepth, len(stack))
+        if not continues:
+            return currentState
+
+def profilePDA(PDA, inputString, stringSeparator, stats = None):
+    # runs the PDA on the input string like runPDA (without printing steps), and returns the PDAStats with
+    # the numbers of this run added - the result of the run is stats.lastAccepted
+    if stats is None:
+        stats = PDAStats(PDA)
+    PDA = stats.PDA
+    states, sigma, stackSigma, rules, start, accept = PDA
+
+    startTime = time.perf_counter()
+    automaton.isPDAValid(PDA, PDA.ruleList) # runPDA skips this for a ValidatedPDA, it is timed for reference
+    stats.validationSeconds += time.perf_counter() - startTime
+
+    startTime = time.perf_counter()
+    inputString = inputString.strip()
+    if not automaton.isStringValid(inputString, stringSeparator, PDA.sigmaSet):
+        raise automaton.InputStringError("Input string contains symbols not in the given alphabet of the PDA")
+    symbols = list(automaton.splitIncludingNoSeparator(inputString, stringSeparator))
+    stats.tokenizationSeconds += time.perf_counter() - startTime
+
+    startTime = time.perf_counter()
+    stack = []
+    ruleHits = stats.ruleHits
+    currentState = profiledEpsilonClosure(start, rules, stack, stats)
+    maximumStackDepth = stats.maximumStackDepth
+    for currentSymbol in symbols:
+        rule = matchingRule(currentState, currentSymbol, rules, stack)
+        if rule is None:
+            stats.noRuleCount += 1
+        else:
+            ruleHits[rule] += 1
+        currentState = automaton.getNextState(currentState, currentSymbol, rules, stack)
+        if len(stack) > maximumStackDepth:
+            maximumStackDepth = len(stack)
+    stats.maximumStackDepth = maximumStackDepth
+    currentState = profiledEpsilonClosure(currentState, rules, stack, stats)
+    stats.simulationSeconds += time.perf_counter() - startTime
+
+    stats.lastAccepted = currentState in PDA.acceptSet
+    stats.runs += 1
+    stats.acceptedRuns += stats.lastAccepted
+    stats.symbols += len(symbols)
+    return stats
@@ -0,0 +1,251 @@
+import PDA as automaton
+import PDACache as cache
+import emulatePDA
+import asyncio
+import concurrent.futures
+import json
+import os
+import sys
+
+# python3 PDAServer.py OPTIONAL(PDA files...) OPTIONAL(--host H) OPTIONAL(--port P) OPTIONAL(--unix path)
+#                      OPTIONAL(--jobs N) OPTIONAL(--batch-size N) OPTIONAL(--batch-wait ms) OPTIONAL(--no-cache)
+#                                           PDA files - .pda files in the PDA Definition Files folder (default: all of them)
+#                                           --host, --port - address the server listens on (default 127.0.0.1:8765)
+#                                           --unix path - listens on a unix socket instead of a TCP port
+#                                           --jobs - worker processes the runs are done in (default: all CPU cores)
+#                                           --batch-size - most input strings sent to a worker at a time (default 256)
+#                                           --batch-wait - how long (in milliseconds) an input string waits for others
+#                                                          to batch it with (default 2)
+#                                           --no-cache - parses the PDA files again instead of loading their .pdac cache
+#
+# an evaluation server: the PDAs are loaded and compiled once, when it starts, and every worker process
+# gets them once, so a request costs a run of the PDA - not an interpreter start and a parseFile
+# it speaks HTTP/1.1 (keep-alive), with JSON bodies:
+#   GET  /pdas - {"pdas" : [names of the loaded PDAs]}
+#   POST /run  - {"pda" : "notregular.pda", "input" : "0011", "separator" : ""} -> {"accepted" : true}
+#                {"pda" : ..., "inputs" : ["01", "0a"], "separator" : ...} -> {"results" : [true, {"error" : ...}]}
+# the event loop only parses requests and answers them - the input strings of all the requests that
+# arrive within --batch-wait of each other are grouped per PDA and separator (micro-batching), and each
+# group is run in a worker process, so one pickled round trip to a worker is shared by many requests
+PDADefinitionFolder = "PDA Definition Files"
+optionsWithValues = ["--host", "--port", "--unix", "--jobs", "--batch-size", "--batch-wait"]
+
+class RequestError(Exception):
+    # a request the server can't answer, answered with status (400, 404, ...) and the message
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+statusReasons = {200 : "OK", 400 : "Bad Request", 404 : "Not Found", 405 : "Method Not Allowed",
+                 413 : "Payload Too Large", 500 : "Internal Server Error"}
+maximumBodySize = 64 * 1024 * 1024 # bytes, larger request bodies are refused
+
+# state of a worker process - every compiled PDA is sent to the worker once, when the pool starts it
+# (like runPDAParallel does), instead of being pickled together with every batch
+workerPDAs = None
+
+def initialiseWorker(compiledPDAs):
+    global workerPDAs
+    workerPDAs = compiledPDAs
+
+def runBatchInWorker(PDAName, stringSeparator, inputStrings):
+    # one result per input string: True/False, or {"error" : message} for a string the PDA can't run
+    compiledPDA = workerPDAs[PDAName]
+    results = []
+    for inputString in inputStrings:
+        try:
+            results.append(automaton.runCompiledPDA(compiledPDA, inputString, stringSeparator, False))
+        except automaton.InputStringError as error:
+            results.append({"error" : str(error)})
+    return results
+
+def loadPDAs(PDAPaths, useCache = True):
+    # name of the file -> CompiledPDA, for every .pda file given
+    compiledPDAs = {}
+    for PDAPath in PDAPaths:
+        compiledPDAs[os.path.basename(PDAPath)] = automaton.compilePDA(cache.loadPDA(PDAPath, useCache))
+    return compiledPDAs
+
+class MicroBatcher:
+    # groups the input strings submitted close together by (PDA name, separator), and runs every group in
+    # the worker pool once it has batchSize strings or its first string waited batchWait seconds
+    __slots__ = ("pool", "batchSize", "batchWait", "pending", "timers")
+
+    def __init__(self, pool, batchSize, batchWait):
+        self.pool = pool
+        self.batchSize = batchSize
+        self.batchWait = batchWait
+        self.pending = {} # (PDA name, separator) -> [(input string, future of its result)]
+        self.timers = {} # (PDA name, separator) -> TimerHandle of the group's flush
+
+    def submit(self, PDAName, stringSeparator, inputString):
+        # a future of the result of one input string
+        loop = asyncio.get_running_loop()
+        key = (PDAName, stringSeparator)
+        future = loop.create_future()
+        group = self.pending.setdefault(key, [])
+        group.append((inputString, future))
+        if len(group) >= self.batchSize:
+            self.flush(key)
+        elif len(group) == 1:
+            self.timers[key] = loop.call_later(self.batchWait, self.flush, key)
+        return future
+
+    def flush(self, key):
+        timer = self.timers.pop(key, None)
+        if timer is not None:
+            timer.cancel()
+        group = self.pending.pop(key, None)
+        if group:
+            asyncio.ensure_future(self.runGroup(key, group))
+
+    async def runMany(self, PDAName, stringSeparator, inputStrings):
+        # the results of a list of input strings - a list of at least batchSize strings is a batch of its own,
+        # split in chunks of batchSize strings that don't wait for other requests
+        if len(inputStrings) < self.batchSize:
+            return list(await asyncio.gather(*[self.submit(PDAName, stringSeparator, inputString) for inputString in inputStrings]))
+        loop = asyncio.get_running_loop()
+        chunkResults = await asyncio.gather(*[
+            loop.run_in_executor(self.pool, runBatchInWorker, PDAName, stringSeparator, inputStrings[start : start + self.batchSize])
+            for start in range(0, len(inputStrings), self.batchSize)])
+        return [result for results in chunkResults for result in results]
+
+    async def runGroup(self, key, group):
+        PDAName, stringSeparator = key
+        loop = asyncio.get_running_loop()
+        try:
+            results = await loop.run_in_executor(self.pool, runBatchInWorker, PDAName, stringSeparator,
+                                                 [inputString for inputString, future in group])
+        except Exception as error: # e.g. a worker process died - every request of the group gets the error
+            for inputString, future in group:
+                if not future.done():
+                    future.set_exception(error)
+            return
+        for (inputString, future), result in zip(group, results):
+            if not future.done(): # the client may have gone away
+                future.set_result(result)
+
+class PDAServer:
+    __slots__ = ("compiledPDAs", "batcher")
+
+    def __init__(self, compiledPDAs, batcher):
+        self.compiledPDAs = compiledPDAs
+        self.batcher = batcher
+
+    async def run(self, request):
+        # answer of POST /run, for the decoded JSON body
+        if not isinstance(request, dict):
+            raise RequestError(400, "The request body must be a JSON object")
+        PDAName = request.get("pda")
+        if not isinstance(PDAName, str) or PDAName not in self.compiledPDAs:
+            raise RequestError(404, f"No PDA named {PDAName} is loaded")
+        stringSeparator = request.get("separator", "")
+        if not isinstance(stringSeparator, str):
+            raise RequestError(400, "separator must be a string")
+        if "inputs" in request:
+            inputStrings = request["inputs"]
+            if not isinstance(inputStrings, list) or not all(isinstance(inputString, str) for inputString in inputStrings):
+                raise RequestError(400, "inputs must be a list of strings")
+            return {"results" : await self.batcher.runMany(PDAName, stringSeparator, inputStrings)}
+        inputString = request.get("input")
+        if not isinstance(inputString, str):
+            raise RequestError(400, "The request needs an input string (input) or a list of them (inputs)")
+        result = await self.batcher.submit(PDAName, stringSeparator, inputString)
+        if isinstance(result, dict):
+            raise RequestError(400, result["error"])
+        return {"accepted" : result}
+
+    async def answer(self, method, path, body):
+        # (status, JSON answer) of one request
+        if path == "/pdas":
+            if method != "GET":
+                raise RequestError(405, "/pdas only answers GET")
+            return 200, {"pdas" : sorted(self.compiledPDAs)}
+        if path == "/run":
+            if method != "POST":
+                raise RequestError(405, "/run only answers POST")
+            try:
+                request = json.loads(body)
+            except ValueError:
+                raise RequestError(400, "The request body isn't valid JSON")
+            return 200, await self.run(request)
+        raise RequestError(404, f"Unknown path {path}")
+
+    async def handleConnection(self, reader, writer):
+        # every request of a keep-alive connection, one after the other
+        try:
+            while True:
+                requestLine = await reader.readline()
+                if not requestLine.strip():
+                    break # the client closed the connection
+                keepAlive = True
+                try:
+                    method, path, version = requestLine.decode("latin-1").split()
+                    headers = {}
+                    while True:
+                        line = await reader.readline()
+                        if line in (b"\r\n", b"\n", b""):
+                            break
+                        name, separator, value = line.decode("latin-1").partition(":")
+                        headers[name.strip().lower()] = value.strip()
+                    keepAlive = headers.get("connection", "").lower() != "close" and version != "HTTP/1.0"
+                    contentLength = int(headers.get("content-length", 0))
+                    if contentLength > maximumBodySize:
+                        keepAlive = False # the body isn't read, so the connection can't be reused
+                        raise RequestError(413, f"The request body is larger than {maximumBodySize} bytes")
+                    body = await reader.readexactly(contentLength)
+                except RequestError as error:
+                    status, answer = error.status, {"error" : str(error)}
+                except ValueError: # a malformed request line or Content-Length
+                    status, answer, keepAlive = 400, {"error" : "Malformed HTTP request"}, False
+                else:
+                    try:
+                        status, answer = await self.answer(method, path, body)
+                    except RequestError as error:
+                        status, answer = error.status, {"error" : str(error)}
+                    except Exception as error:
+                        # e.g. BrokenProcessPool when a worker died - the client still gets an answer
+                        status, answer = 500, {"error" : f"{type(error).__name__}: {error}"}
+                payload = json.dumps(answer).encode("utf-8")
+                writer.write(f"HTTP/1.1 {status} {statusReasons[status]}\r\n"
+                             f"Content-Type: application/json\r\nContent-Length: {len(payload)}\r\n"
+                             f"Connection: {'keep-alive' if keepAlive else 'close'}\r\n\r\n".encode("latin-1") + payload)
+                await writer.drain()
+                if not keepAlive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass # the client went away in the middle of a request
+        finally:
+            writer.close()
+
+async def serve(compiledPDAs, host, port, unixPath, jobs, batchSize, batchWait):
+    with concurrent.futures.ProcessPoolExecutor(jobs, initializer = initialiseWorker, initargs = (compiledPDAs,)) as pool:
+        server = PDAServer(compiledPDAs, MicroBatcher(pool, batchSize, batchWait))
+        if unixPath is not None:
+            listener = await asyncio.start_unix_server(server.handleConnection, unixPath)
+            print(f"Serving {len(compiledPDAs)} PDAs on unix socket {unixPath}")
+        else:
+            listener = await asyncio.start_server(server.handleConnection, host, port)
+            print(f"Serving {len(compiledPDAs)} PDAs on http://{host}:{port}")
+        async with listener:
+            await listener.serve_forever()
+
+def main():
+    arguments, options = emulatePDA.splitOptions(sys.argv, optionsWithValues)
+    if len(arguments) > 1:
+        PDAPaths = [os.path.join(PDADefinitionFolder, fileName) for fileName in arguments[1:]]
+    else:
+        PDAPaths = [os.path.join(PDADefinitionFolder, fileName) for fileName in sorted(os.listdir(PDADefinitionFolder))
+                    if fileName.endswith(".pda")]
+    compiledPDAs = loadPDAs(PDAPaths, "--no-cache" not in options)
+    jobs = int(options["--jobs"]) if "--jobs" in options else None # None - all CPU cores
+    try:
+        asyncio.run(serve(compiledPDAs, options.get("--host", "127.0.0.1"), int(options.get("--port", 8765)),
+                          options.get("--unix"), jobs, int(options.get("--batch-size", 256)),
+                          float(options.get("--batch-wait", 2)) / 1000))
+    except KeyboardInterrupt:
+        pass
+
+# the guard keeps the worker processes (which may import this module) from starting another server
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+# step traces of PDA runs
+# printPDASteps prints every symbol and state as the PDA runs, which is slow on long inputs, and never shows
+# the stack. A TraceRecorder passed as the trace argument of runPDA / runCompiledPDA / runPDAStream records
+# every move as an event instead
+#     (step, symbol, fromState, toState, popSymbol, pushSymbol)
+# step is the number of input symbols read when the move happened (epsilon moves before the first symbol
+# are step 0), symbol is the input symbol code (numSymbols for epsilon moves), and popSymbol/pushSymbol
+# the stack symbol codes popped and pushed (NO_RULE if nothing was). A move of the PDA that stays in the
+# same state because no rule matched is an event that pops and pushes nothing, and a move pushing several
+# symbols is one event per pushed symbol (the first one has the state change and the pop).
+# the codes are those of the CompiledPDA, and are turned back into names when the trace is viewed
+#
+# events are kept in a preallocated array of ints:
+# - with a trace file, the array is a write buffer - every time it fills up it is written to the file, so
+#   the file has every event of the run
+# - without one, the array is a ring buffer keeping the last capacity events (the older ones are counted
+#   in droppedEvents) - save writes it to a trace file once the run is over, e.g. after a failure
+#
+# trace file layout: TRACE_MAGIC, the length of the header (4 bytes, little endian), the header as JSON
+# (names of the states and symbols, byte order of the events, droppedEvents), then the events as
+# EVENT_FIELDS ints each. The last event of a finished run is a result event (see finish).
+# viewTrace.py renders trace files as text or JSON
+import PDA as automaton
+from array import array
+import json
+import sys
+
+TRACE_MAGIC = b"PDAT"
+TRACE_FORMAT = 1
+EVENT_FIELDS = 6 # step, symbol, fromState, toState, popSymbol, pushSymbol
+RESULT_STEP = -1 # step of the result event: (RESULT_STEP, accepted, finalState, finalState, NO_RULE, NO_RULE)
+
+class TraceRecorder:
+    __slots__ = ("compiledPDA", "events", "position", "count", "droppedEvents", "traceFile")
+
+    def __init__(self, compiledPDA, capacity = 65536, tracePath = None):
+        # capacity - number of events the buffer holds
+        # tracePath - file every event is written to, None to keep only the last capacity events in memory
+        self.compiledPDA = compiledPDA
+        self.events = array("i", [0]) * (capacity * EVENT_FIELDS)
+        self.position = 0 # where the next event goes in events
+        self.count = 0 # events recorded, including the dropped ones
+        self.droppedEvents = 0
+        self.traceFile = None
+        if tracePath is not None:
+            self.traceFile = open(tracePath, "wb")
+            writeTraceHeader(self.traceFile, compiledPDA, 0)
+
+    def record(self, step, symbol, fromState, toState, popSymbol, pushSymbol):
+        events = self.events
+        position = self.position
+        events[position] = step
+        events[position + 1] = symbol
+        events[position + 2] = fromState
+        events[position + 3] = toState
+        events[position + 4] = popSymbol
+        events[position + 5] = pushSymbol
+        position += EVENT_FIELDS
+        if position == len(events):
+            if self.traceFile is not None:
+                events.tofile(self.traceFile)
+            position = 0 # the ring buffer wraps around, overwriting its oldest events
+        self.position = position
+        self.count += 1
+        if self.traceFile is None and self.count * EVENT_FIELDS > len(events):
+            self.droppedEvents += 1
+
+    def finish(self, finalState, accepted):
+        # records the result of the run (runPDA calls it when the run is over)
+        self.record(RESULT_STEP, int(accepted), finalState, finalState, automaton.NO_RULE, automaton.NO_RULE)
+        self.close()
+
+    def close(self):
+        # writes out what is left in the buffer and closes the trace file - also for runs that stopped with
+        # an exception, so the trace shows every move up to it
+        if self.traceFile is not None:
+            self.events[:self.position].tofile(self.traceFile)
+            self.position = 0
+            self.traceFile.close()
+            self.traceFile = None
+
+    def eventList(self):
+        # the events in the buffer, oldest first, as a flat array of ints
+        # once the buffer was filled (exactly full included, position is back at 0) the oldest event is
+        # at position
+        if self.count * EVENT_FIELDS < len(self.events) or self.traceFile is not None:
+            return self.events[:self.position]
+        return self.events[self.position:] + self.events[:self.position]
+
+    def save(self, tracePath):
+        # writes the events kept in the ring buffer to a trace file
+        with open(tracePath, "wb") as traceFile:
+            writeTraceHeader(traceFile, self.compiledPDA, self.droppedEvents)
+            self.eventList().tofile(traceFile)
+
+def writeTraceHeader(traceFile, compiledPDA, droppedEvents):
+    header = json.dumps({
+        "format" : TRACE_FORMAT,
+        "states" : compiledPDA.stateNames,
+        "symbols" : compiledPDA.symbolNames + ["epsilon"], # the epsilon code is numSymbols
+        "stackSymbols" : compiledPDA.stackNames,
+        "byteOrder" : sys.byteorder,
+        "droppedEvents" : droppedEvents
+    }).encode("utf-8")
+    traceFile.write(TRACE_MAGIC)
+    traceFile.write(len(header).to_bytes(4, "little"))
+    traceFile.write(header)
+
+def readTrace(tracePath):
+    # (header, events) of a trace file - events is a list of EVENT_FIELDS-tuples
+    with open(tracePath, "rb") as traceFile:
+        if traceFile.read(len(TRACE_MAGIC)) != TRACE_MAGIC:
+            raise automaton.PDAError(f"{tracePath} is not a PDA trace file")
+        headerLength = int.from_bytes(traceFile.read(4), "little")
+        header = json.loads(traceFile.read(headerLength).decode("utf-8"))
+        events = array("i")
+        events.frombytes(traceFile.read())
+    if header["byteOrder"] != sys.byteorder:
+        events.byteswap()
+    return header, [tuple(events[position:position + EVENT_FIELDS]) for position in range(0, len(events), EVENT_FIELDS)]
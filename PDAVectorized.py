@@ -0,0 +1,224 @@
+# lock-step evaluation of many input strings with NumPy
+# runPDABatch runs the input strings one after the other, with a Python loop iteration per symbol. Here all
+# the strings advance together, one symbol position at a time: the states, stack heights and stack tops of
+# the strings are vectors, their stacks are the rows of a 2-D array, and a step of every string is a few
+# NumPy lookups into array forms of the rules. Worth it for many short strings (small alphabets keep the
+# tables and the stack array small); for a few long strings runPDA is as fast
+# results are the same as runPDA's for every PDA - including staying in the same state when no rule matches
+# (runPDA's priorities, a rule that doesn't pop before the one popping the top, make the move of every
+# (state, symbol, stack top) unique, so the tables hold one move per cell). NumPy is only needed here -
+# importing this module works without it, vectorizePDA raises ImportError
+import PDA as automaton
+import itertools
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+class VectorizedPDA:
+    # the tables of a CompiledPDA as NumPy arrays, built by vectorizePDA
+    # the move of a state on an input symbol with a stack top is at
+    #     cell = state * stride + top * numSymbols + symbol     stride = (numStackSymbols + 1) * numSymbols
+    # (top numStackSymbols for an empty stack, like in the move table of CompiledPDA)
+    # moveNext[cell] is the next state times stride, movePop[cell] 1 if the move pops the top,
+    # movePushLength[cell] how many symbols it pushes and movePush[k][cell] the k-th of them (bottom first)
+    # the epsilon closure tables (closureNext, closureContinues, at state * (numStackSymbols + 1) + top) and
+    # acceptMask are the ones of the CompiledPDA as arrays
+    __slots__ = ("compiledPDA", "numSymbols", "numStackSymbols", "stride", "stackType",
+                 "moveNext", "movePop", "movePushLength", "movePush",
+                 "closureNext", "closureContinues", "acceptMask", "characterCodes")
+
+def vectorizePDA(PDA):
+    # the VectorizedPDA of a PDA tuple or a CompiledPDA
+    if numpy is None:
+        raise ImportError("PDAVectorized needs NumPy (pip install numpy)")
+    if isinstance(PDA, VectorizedPDA):
+        return PDA
+    compiled = PDA if isinstance(PDA, automaton.CompiledPDA) else automaton.compilePDA(PDA)
+    numSymbols = compiled.numSymbols
+    numStackSymbols = compiled.numStackSymbols
+    numStates = len(compiled.stateNames)
+    stride = (numStackSymbols + 1) * numSymbols
+
+    vectorized = VectorizedPDA()
+    vectorized.compiledPDA = compiled
+    vectorized.numSymbols = numSymbols
+    vectorized.numStackSymbols = numStackSymbols
+    vectorized.stride = stride
+    # the smallest int type that holds every stack symbol and the empty stack mark (numStackSymbols)
+    vectorized.stackType = numpy.min_scalar_type(numStackSymbols)
+
+    pushStrings = compiled.pushStrings
+    maximumPush = max([1] + [len(pushSymbols) for pushSymbols in pushStrings])
+    moveNext = numpy.repeat(numpy.arange(numStates, dtype = numpy.intp) * stride, stride) # no rule - stays
+    movePop = numpy.zeros(numStates * stride, dtype = numpy.intp)
+    movePushLength = numpy.zeros(numStates * stride, dtype = numpy.intp)
+    movePush = numpy.zeros((maximumPush, numStates * stride), dtype = vectorized.stackType)
+
+    def setMove(cell, nextState, pops, pushSymbol):
+        moveNext[cell] = nextState * stride
+        movePop[cell] = pops
+        pushSymbols = compiled.pushedSymbols(pushSymbol)
+        movePushLength[cell] = len(pushSymbols)
+        for position, pushSymbol in enumerate(pushSymbols):
+            movePush[position, cell] = pushSymbol
+
+    # same priorities as CompiledPDA.step: a rule that doesn't pop, then the one popping the top
+    for state in range(numStates):
+        for symbol in range(numSymbols):
+            row = state * (numSymbols + 1) + symbol
+            if compiled.noPopNext[row] != automaton.NO_RULE:
+                for top in range(numStackSymbols + 1):
+                    setMove(state * stride + top * numSymbols + symbol, compiled.noPopNext[row], 0, compiled.noPopPush[row])
+                continue
+            for top in range(numStackSymbols):
+                nextState = compiled.popNext[row * numStackSymbols + top]
+                if nextState != automaton.NO_RULE:
+                    setMove(state * stride + top * numSymbols + symbol, nextState, 1, compiled.popPush[row * numStackSymbols + top])
+    vectorized.moveNext = moveNext
+    vectorized.movePop = movePop
+    vectorized.movePushLength = movePushLength
+    vectorized.movePush = movePush
+
+    vectorized.closureNext = numpy.array(compiled.closureNext, dtype = numpy.intp)
+    vectorized.closureContinues = numpy.frombuffer(bytes(compiled.closureContinues), dtype = numpy.uint8).astype(bool)
+    vectorized.acceptMask = numpy.frombuffer(bytes(compiled.acceptMask), dtype = numpy.uint8).astype(bool)
+
+    # code point -> input symbol code (-1 for none), for input strings without a separator - every symbol
+    # is one character then, so a whole batch is translated with one lookup
+    characters = [symbol for symbol in compiled.symbolNames if len(symbol) == 1]
+    vectorized.characterCodes = numpy.full(max([ord(character) for character in characters], default = -1) + 1, -1, dtype = numpy.intp)
+    for character in characters:
+        vectorized.characterCodes[ord(character)] = compiled.symbolIndex[character]
+    return vectorized
+
+def encodeInputs(vectorized, inputStrings, stringSeparator):
+    # the symbol codes of all the input strings one after the other, and the number of symbols of every
+    # string - split the way runPDA splits them
+    inputStrings = [inputString.strip() for inputString in inputStrings]
+    if stringSeparator == "":
+        lengths = numpy.fromiter(map(len, inputStrings), dtype = numpy.intp, count = len(inputStrings))
+        codePoints = numpy.frombuffer("".join(inputStrings).encode("utf-32-le"), dtype = numpy.uint32)
+        characterCodes = vectorized.characterCodes
+        if codePoints.size and codePoints.max() >= characterCodes.size:
+            raise automaton.InputStringError("Input string contains symbols not in the given alphabet of the PDA")
+        codes = characterCodes[codePoints]
+    else:
+        splitStrings = [inputString.split(stringSeparator) for inputString in inputStrings]
+        lengths = numpy.fromiter(map(len, splitStrings), dtype = numpy.intp, count = len(splitStrings))
+        symbolIndex = vectorized.compiledPDA.symbolIndex
+        # unknown symbols get -1, like characters missing from characterCodes
+        codes = numpy.fromiter((symbolIndex.get(symbol, -1) for symbol in itertools.chain.from_iterable(splitStrings)),
+                               dtype = numpy.intp, count = int(lengths.sum()))
+    if codes.size and codes.min() < 0:
+        raise automaton.InputStringError("Input string contains symbols not in the given alphabet of the PDA")
+    return codes, lengths
+
+def runPDAVectorized(PDA, inputStrings, stringSeparator):
+    # same results as runPDABatch(PDA, inputStrings, stringSeparator), as a NumPy array of bools in the
+    # order of the input strings (.tolist() gives the list runPDABatch returns)
+    # PDA - a PDA tuple, a CompiledPDA or a VectorizedPDA (pass the VectorizedPDA to reuse its tables)
+    vectorized = vectorizePDA(PDA)
+    compiled = vectorized.compiledPDA
+    numSymbols = vectorized.numSymbols
+    emptyStack = vectorized.numStackSymbols # the mark at the bottom of every stack row
+    moveNext = vectorized.moveNext
+    movePop = vectorized.movePop
+    movePushLength = vectorized.movePushLength
+    movePush = vectorized.movePush
+    maximumPush = len(movePush)
+    codes, lengths = encodeInputs(vectorized, inputStrings, stringSeparator)
+
+    # the strings are sorted from the longest to the shortest, so the strings still running at a symbol
+    # position are always the first ones - a step works on slices, and a string is done once it drops out
+    order = numpy.argsort(-lengths, kind = "stable")
+    sortedLengths = lengths[order]
+    count = len(order)
+    maximumLength = int(sortedLengths[0]) if count else 0
+    running = numpy.searchsorted(-sortedLengths, -numpy.arange(maximumLength + 1), side = "left") # strings longer than every position
+    # symbol t of the i-th (sorted) string is at columnStart[t] + i - a column of symbols for every position
+    columnStart = numpy.concatenate(([0], numpy.cumsum(running[:maximumLength])))
+    rowStart = numpy.concatenate(([0], numpy.cumsum(lengths)))[order] # where the sorted strings start in codes
+    sortedRows = numpy.repeat(numpy.arange(count), sortedLengths)
+    positions = numpy.arange(sortedRows.size) - numpy.repeat(numpy.cumsum(sortedLengths) - sortedLengths, sortedLengths)
+    columns = numpy.empty(sortedRows.size, dtype = numpy.intp)
+    columns[columnStart[positions] + sortedRows] = codes[rowStart[sortedRows] + positions]
+
+    # every string starts from the epsilon closure of the start state on an empty stack
+    initialStack = []
+    initialState = compiled.epsilonClosure(compiled.start, initialStack)
+    stackRows = count
+    capacity = max(16, len(initialStack) + 1 + maximumPush)
+    stacks = numpy.empty((stackRows, capacity), dtype = vectorized.stackType)
+    stacks[:, 0] = emptyStack
+    stacks[:, 1 : len(initialStack) + 1] = initialStack
+    heights = numpy.full(count, len(initialStack) + 1, dtype = numpy.intp) # the empty stack mark counts
+    tops = numpy.full(count, initialStack[-1] if initialStack else emptyStack, dtype = numpy.intp)
+    bases = numpy.full(count, initialState * vectorized.stride, dtype = numpy.intp) # states times stride
+    maximumGrowth = max(0, int((movePushLength - movePop).max()))
+    heightBound = len(initialStack) + 1 # no string's stack is higher than this
+    accepted = numpy.zeros(count, dtype = bool)
+
+    for position in range(maximumLength + 1):
+        active = int(running[position]) if position < maximumLength else 0
+        finished = int(running[position - 1]) if position else count
+        if active < finished:
+            # the strings that ended at this position - their stacks aren't needed after the epsilon closure
+            accepted[active : finished] = finishStrings(vectorized, stacks, active, bases[active : finished] // vectorized.stride,
+                                                        heights[active : finished], tops[active : finished])
+            if active <= stackRows // 4:
+                stackRows = active
+                stacks = stacks[:active].copy()
+        if not active:
+            break
+        if heightBound + maximumPush > capacity:
+            heightBound = int(heights[:active].max())
+            if heightBound + maximumPush > capacity:
+                capacity = max(2 * capacity, heightBound + maximumPush)
+                grown = numpy.empty((stackRows, capacity), dtype = vectorized.stackType)
+                grown[:, : stacks.shape[1]] = stacks
+                stacks = grown
+        heightBound += maximumGrowth
+
+        cells = bases[:active] + tops[:active] * numSymbols + columns[columnStart[position] : columnStart[position] + active]
+        flatStacks = stacks.reshape(-1)
+        rowOffsets = numpy.arange(active) * capacity
+        # the pushed symbols are written above the height after the pop for every string - for a move that
+        # pushes less, the extra writes land above its new top and are never read
+        writeAt = rowOffsets + heights[:active] - movePop[cells]
+        for pushed in range(maximumPush):
+            flatStacks[writeAt + pushed] = movePush[pushed, cells]
+        heights[:active] = writeAt - rowOffsets + movePushLength[cells]
+        tops[:active] = flatStacks[rowOffsets + heights[:active] - 1]
+        bases[:active] = moveNext[cells]
+
+    results = numpy.empty(count, dtype = bool)
+    results[order] = accepted
+    return results
+
+def finishStrings(vectorized, stacks, firstRow, states, heights, tops):
+    # acceptance of the strings in the stack rows from firstRow on, after their final epsilon closure
+    # (CompiledPDA.epsilonClosure, for many strings - only closures that pop below the top they started
+    # from need more than one lookup)
+    width = vectorized.numStackSymbols + 1
+    rows = numpy.arange(firstRow, firstRow + len(states))
+    states = states.copy()
+    heights = heights.copy()
+    tops = tops.copy()
+    accepted = numpy.zeros(len(states), dtype = bool)
+    pending = numpy.arange(len(states)) # positions in accepted still in the closure
+    while pending.size:
+        cells = states * width + tops
+        nextStates = vectorized.closureNext[cells]
+        continues = vectorized.closureContinues[cells]
+        states = numpy.where(nextStates == automaton.NO_RULE, states, nextStates)
+        done = ~continues
+        accepted[pending[done]] = vectorized.acceptMask[states[done]]
+        # a closure that goes on popped the top - it continues from the symbol below
+        pending = pending[continues]
+        states = states[continues]
+        rows = rows[continues]
+        heights = heights[continues] - 1
+        tops = stacks[rows, heights - 1].astype(numpy.intp)
+    return accepted
@@ -0,0 +1,213 @@
+import PDA as automaton
+import emulatePDA
+import io
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+import tracemalloc
+
+# python3 benchmarkPDA.py OPTIONAL(--max-n N) OPTIONAL(--states N,N,...) OPTIONAL(--repeat R)
+#                         OPTIONAL(--output results.json) OPTIONAL(--compare baseline.json)
+#                                           --max-n - largest n of the 0ⁿ1ⁿ inputs (10, 100, ... up to it, default 10⁶)
+#                                           --states - state counts of the synthetic PDAs (default 100,1000,5000)
+#                                           --repeat - every timing is the best of R runs (default 3)
+#                                           --output - writes the results as JSON, to compare between commits
+#                                           --compare - prints how every case changed against an earlier --output file
+#
+# every case times parseFile, isPDAValid, compilePDA and runPDA (walking the rules dict of the parsed tuple,
+# and on the compiled PDA) separately, and reports the symbols per second of the runs, the peak memory
+# allocated by a run (tracemalloc) and the maximum stack depth it reaches. Memory and stack depth are
+# measured in separate, untimed runs, so they don't slow the timings down
+PDADefinitionFolder = "PDA Definition Files"
+optionsWithValues = ["--max-n", "--states", "--repeat", "--output", "--compare"]
+
+def bestTime(function, repeat):
+    # the fastest of repeat runs of function() (the least disturbed by the rest of the system), and its result
+    bestSeconds = None
+    for run in range(repeat):
+        startTime = time.perf_counter()
+        result = function()
+        seconds = time.perf_counter() - startTime
+        if bestSeconds is None or seconds < bestSeconds:
+            bestSeconds = seconds
+    return bestSeconds, result
+
+def peakMemory(function):
+    # the peak memory (in bytes) allocated while function() runs
+    tracemalloc.start()
+    try:
+        function()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+def runStatistics(compiledPDA, inputString, stringSeparator):
+    # runs the PDA step by step like runCompiledPDA, recording how deep the stack gets and how many
+    # symbols a rule matched (the others take the "no rule, stay in the same state" fallback)
+    # returns (maximum stack depth, rule hits)
+    symbols = automaton.splitIncludingNoSeparator(inputString.strip(), stringSeparator)
+    stack = []
+    state = compiledPDA.epsilonClosure(compiledPDA.start, stack)
+    maximumDepth = len(stack)
+    ruleHits = 0
+    for symbol in symbols:
+        symbolCode = compiledPDA.symbolIndex[symbol]
+        row = state * (compiledPDA.numSymbols + 1) + symbolCode
+        if compiledPDA.noPopNext[row] != automaton.NO_RULE or \
+           (stack and compiledPDA.popNext[row * compiledPDA.numStackSymbols + stack[-1]] != automaton.NO_RULE):
+            ruleHits += 1
+        state = compiledPDA.step(state, symbolCode, stack)
+        if len(stack) > maximumDepth:
+            maximumDepth = len(stack)
+    compiledPDA.epsilonClosure(state, stack)
+    return max(maximumDepth, len(stack)), ruleHits
+
+def benchmarkCase(name, definitionText, inputString, stringSeparator, repeat):
+    # times every stage for one PDA definition (as the text of a .pda file) and one input string
+    result = {"case" : name}
+    result["parseFileSeconds"], pda = bestTime(lambda: automaton.parseFile(io.StringIO(definitionText)), repeat)
+    result["isPDAValidSeconds"], valid = bestTime(lambda: automaton.isPDAValid(pda, pda.ruleList), repeat)
+    # compilePDA keeps its result on the PDA, so every repeat compiles a fresh copy (made outside the timing)
+    # - timing pda itself again would only measure the cached lookup
+    freshPDAs = iter([automaton.ValidatedPDA(tuple(pda), pda.ruleList) for run in range(repeat)])
+    result["compilePDASeconds"], compiledPDA = bestTime(lambda: automaton.compilePDA(next(freshPDAs)), repeat)
+
+    numSymbols = len(automaton.splitIncludingNoSeparator(inputString.strip(), stringSeparator))
+    result["symbols"] = numSymbols
+    result["states"] = len(pda[0])
+    result["rules"] = len(pda.ruleList)
+    # runPDA takes the compiled tables of a deterministic PDA - runPDARules times the walk over the rules dict
+    result["runPDASeconds"], accepted = bestTime(lambda: automaton.runPDARules(pda, inputString, stringSeparator, False), repeat)
+    result["runCompiledPDASeconds"], compiledAccepted = bestTime(
+        lambda: automaton.runPDA(compiledPDA, inputString, stringSeparator, False), repeat)
+    if accepted != compiledAccepted:
+        raise automaton.PDAError(f"{name}: runPDA and the compiled PDA disagree on the input string")
+    result["accepted"] = accepted
+    result["runPDASymbolsPerSecond"] = numSymbols / max(result["runPDASeconds"], 1e-9)
+    result["runCompiledPDASymbolsPerSecond"] = numSymbols / max(result["runCompiledPDASeconds"], 1e-9)
+    result["peakMemoryBytes"] = peakMemory(lambda: automaton.runPDA(compiledPDA, inputString, stringSeparator, False))
+    result["maximumStackDepth"], ruleHits = runStatistics(compiledPDA, inputString, stringSeparator)
+    # share of the symbols a rule matched - a low one means the timings mostly measure the fallback
+    result["ruleHitRatio"] = ruleHits / max(numSymbols, 1)
+    return result
+
+def readDefinition(fileName):
+    with open(os.path.join(PDADefinitionFolder, fileName), "r") as definitionFile:
+        return definitionFile.read()
+
+def syntheticDefinition(numStates, numSymbols = 4, numStackSymbols = 4, seed = 0):
+    # text of a random .pda file with numStates states - every state has a rule for every input symbol,
+    # that either pushes a stack symbol or pops one, so the runs keep the stack moving. The popping rows
+    # also pop the bottom $ and put it back under a pushed symbol, so a rule matches whatever the stack
+    # top is, and the runs never get stuck in a state (runBenchmarks checks this)
+    randomGenerator = random.Random(seed)
+    states = [f"s{state}" for state in range(numStates)]
+    sigma = [f"a{symbol}" for symbol in range(numSymbols)]
+    stackSigma = [f"X{symbol}" for symbol in range(numStackSymbols)] + ["$"]
+    rules = [f"{states[0]}, epsilon, epsilon, $, {states[1 % numStates]}"]
+    for state in states:
+        for symbol in sigma:
+            destinationState = randomGenerator.choice(states)
+            if randomGenerator.random() < 0.5:
+                rules.append(f"{state}, {symbol}, epsilon, {randomGenerator.choice(stackSigma[:-1])}, {destinationState}")
+            else:
+                for popSymbol in stackSigma[:-1]:
+                    rules.append(f"{state}, {symbol}, {popSymbol}, epsilon, {randomGenerator.choice(states)}")
+                rules.append(f"{state}, {symbol}, $, {randomGenerator.choice(stackSigma[:-1])} $, {randomGenerator.choice(states)}")
+    accept = states[::10]
+    sections = [("States", states), ("Sigma", sigma), ("Stack Sigma", stackSigma), ("Rules", rules),
+                ("Start", [states[0]]), ("Accept", accept)]
+    return "\n".join(f"[{section}]\n" + "\n".join(lines) + "\nEnd\n" for section, lines in sections)
+
+def randomInput(symbols, length, seed = 0):
+    randomGenerator = random.Random(seed)
+    return [randomGenerator.choice(symbols) for position in range(length)]
+
+def runBenchmarks(maximumN, stateCounts, repeat):
+    results = []
+    notRegular = readDefinition("notregular.pda")
+    n = 10
+    while n <= maximumN:
+        results.append(benchmarkCase(f"notregular 0^n1^n n={n}", notRegular, "0" * n + "1" * n, "", repeat))
+        results.append(benchmarkCase(f"notregular random length={2 * n}", notRegular,
+                                     "".join(randomInput("01", 2 * n, seed = n)), "", repeat))
+        n *= 10
+
+    escapeTheRoom = readDefinition("escapeTheRoom.pda")
+    moves = ["UP", "DOWN", "LEFT", "RIGHT", "PICK"]
+    length = 1000
+    while length <= maximumN:
+        results.append(benchmarkCase(f"escapeTheRoom random walk length={length}", escapeTheRoom,
+                                     " ".join(randomInput(moves, length, seed = length)), " ", repeat))
+        length *= 100
+
+    for numStates in stateCounts:
+        definitionText = syntheticDefinition(numStates, seed = numStates)
+        symbols = [f"a{symbol}" for symbol in range(4)]
+        length = min(maximumN, 100000)
+        result = benchmarkCase(f"synthetic states={numStates} length={length}", definitionText,
+                               " ".join(randomInput(symbols, length, seed = numStates)), " ", repeat)
+        if result["ruleHitRatio"] < 1:
+            raise automaton.PDAError(f"{result['case']}: a rule matched only {result['ruleHitRatio']:.1%} of the symbols")
+        results.append(result)
+    return results
+
+def currentCommit():
+    # the git commit the benchmark ran on, if it ran inside a git checkout
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output = True, text = True, check = True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def printResults(results):
+    print(f"{'case':<45} {'parse s':>9} {'valid s':>9} {'run s':>9} {'sym/s':>12} {'compiled sym/s':>15} {'peak KiB':>10} {'stack':>9} {'hits':>7}")
+    for result in results:
+        print(f"{result['case']:<45} {result['parseFileSeconds']:>9.4f} {result['isPDAValidSeconds']:>9.4f} "
+              f"{result['runPDASeconds']:>9.4f} {result['runPDASymbolsPerSecond']:>12.0f} "
+              f"{result['runCompiledPDASymbolsPerSecond']:>15.0f} {result['peakMemoryBytes'] / 1024:>10.1f} "
+              f"{result['maximumStackDepth']:>9} {result['ruleHitRatio']:>7.1%}")
+
+def compareResults(results, baselineResults):
+    # ratio of every timing to the baseline with the same case name - above 1 means slower than the baseline
+    baseline = {result["case"] : result for result in baselineResults}
+    timings = ["parseFileSeconds", "isPDAValidSeconds", "compilePDASeconds", "runPDASeconds", "runCompiledPDASeconds"]
+    print(f"{'case':<45} " + " ".join(f"{timing[:-7]:>14}" for timing in timings))
+    for result in results:
+        if result["case"] not in baseline:
+            continue
+        ratios = []
+        for timing in timings:
+            baselineSeconds = baseline[result["case"]].get(timing)
+            ratios.append("-" if not baselineSeconds else f"{result[timing] / baselineSeconds:.2f}x")
+        print(f"{result['case']:<45} " + " ".join(f"{ratio:>14}" for ratio in ratios))
+
+def main():
+    arguments, options = emulatePDA.splitOptions(sys.argv, optionsWithValues)
+    maximumN = int(float(options.get("--max-n", 10 ** 6))) # accepts 1e7 as well as 10000000
+    stateCounts = [int(count) for count in str(options.get("--states", "100,1000,5000")).split(",")]
+    repeat = int(options.get("--repeat", 3))
+
+    results = runBenchmarks(maximumN, stateCounts, repeat)
+    printResults(results)
+    if "--output" in options:
+        report = {
+            "commit" : currentCommit(),
+            "time" : time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python" : platform.python_version(),
+            "platform" : platform.platform(),
+            "repeat" : repeat,
+            "results" : results
+        }
+        with open(options["--output"], "w") as outputFile:
+            json.dump(report, outputFile, indent = 2)
+    if "--compare" in options:
+        with open(options["--compare"], "r") as baselineFile:
+            print()
+            compareResults(results, json.load(baselineFile)["results"])
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,32 @@
 import PDA as automaton
+import NPDA as nondeterministic
+import CFG as grammars
+import PDACache as cache
+import PDATrace as tracing
+import PDAProfile as profiling
+import PDAOptimizer as optimizer
+import PDAVectorized as vectorized
 import sys
 import os
 
-# python3 emulatePDA.py PDAfile inputFile OPTIONAL(1/0) 
+# python3 emulatePDA.py PDAfile inputFile OPTIONAL(1/0) OPTIONAL(separator) OPTIONAL(--batch)
 #                                           1 - all intermediate steps printed to the output
 #                                           0 - only accepted/rejected printed to the screen
+#                                           --batch - the input file holds one input string per line
+#                                                     (a directory of input files is always run as a batch)
+#                                           --stream - the input file is read in chunks instead of all at once
+#                                                      (input file - reads the input from stdin)
+#                                           --nondeterministic - explores every branch of the PDA (see NPDA.py)
+#                                           --grammar - the definition file is a context free grammar (see CFG.py)
+#                                           --no-cache - parses the PDA file again instead of loading its .pdac cache
+#                                           --trace file - records every move of the run to a trace file (see viewTrace.py)
+#                                           --trace-capacity N - only keeps the last N moves in memory and writes them at the end
+#                                           --profile - prints how often every rule fired, the stack depth and timings (see PDAProfile.py)
+#                                           --optimize - removes unreachable states and dead rules before the run, and prints what changed (see PDAOptimizer.py)
+#                                           --check-determinism - prints the pairs of rules that make the PDA nondeterministic, before the run
+#                                           --vectorized - runs a batch with NumPy, all input strings in lock-step (see PDAVectorized.py)
+#                                           --compact-stack - keeps the stack run-length encoded (for deep stacks, see CompactStack in PDA.py)
+#                                           --max-stack-depth N - stops the run with StackDepthError once the stack holds more than N symbols
 class PDAFileNotFoundError(Exception):
     pass
 
@@ -24,69 +46,222 @@ def changeDirectory(directoryPath):
     else:
         raise DirectoryNotFoundError(f"Error: Directory '{directoryPath}' does not exist.")
 
-# support for IDE running script
-# easily modifiable to make more modular -
-# currently we are using two subfolders to be more organised - one with all the .PDA files
-# and one with all of the input files to feed into the PDA
-PDADefinitionFolder = "PDA Definition Files"
-inputFolder = "Input Files"
-if len(sys.argv) == 1:
-    try:
-        changeDirectory(PDADefinitionFolder)
-        inputPDAFile = open(input("Give PDA Definition file name: "), "r")
-        os.chdir("..")
-        changeDirectory(inputFolder)
-        inputStringFile = open(input("Give input file name: "), "r")
-        os.chdir("..")
-        allowVerbosity = bool(int(input("Want to output all steps taken by the PDA? (Input 1/0) ")))
-        stringInput = input("What separator is used between the symbols in the input file? (Space -> ' ', NoSeparator -> '', ; -> ';', etc.) ")
-        if stringInput.upper() == "SPACE":
-            stringSeparator = " "
-        elif stringInput.upper() == "NOSEPARATOR":
-            stringSeparator = ""
-        else:
-            stringSeparator = stringInput
-    except FileNotFoundError:
-        raise PDAFileNotFoundError(f"PDA file not found in directory {os.getcwd()}") 
+def readBatchInputs(inputPath):
+    # returns a list of (label, inputString) pairs
+    # a directory gives one input string per file, a file gives one input string per line
+    if os.path.isdir(inputPath):
+        batchInputs = []
+        for fileName in sorted(os.listdir(inputPath)):
+            filePath = os.path.join(inputPath, fileName)
+            if os.path.isfile(filePath):
+                with open(filePath, "r") as inputFile:
+                    batchInputs.append((fileName, inputFile.read()))
+        return batchInputs
+    with open(inputPath, "r") as inputFile:
+        return [(f"line {lineNumber}", line) for lineNumber, line in enumerate(inputFile.read().splitlines(), start = 1)]
 
-# support for CLI running script
-#         
-elif len(sys.argv) == 2:
-    raise NotEnoughArgummentsError("You need to also give input file name as an argument, and optionally if you want to output all steps taken by the PDA (1/0 as third argument) ")
+# flags (starting with --) can be given anywhere on the command line, the rest are positional arguments
+# flags that take a value can be written as --jobs 4 or --jobs=4
+optionsWithValues = ["--jobs", "--chunk-size", "--trace", "--trace-capacity", "--max-stack-depth"]
 
-else:     
-    try:
-        changeDirectory(PDADefinitionFolder)
-        inputPDAFile = open(sys.argv[1], "r")
-        os.chdir("..")
-        changeDirectory(inputFolder)
-        inputStringFile = open(sys.argv[2], "r")
-        os.chdir("..")
-        if len(sys.argv) >= 4: 
-            allowVerbosity = bool(int(sys.argv[3])) # 1 or 0 if i want all intermediate steps printed to the output or not
+def splitOptions(argv, valueOptions = optionsWithValues):
+    # valueOptions - the flags that take a value (benchmarkPDA.py passes its own)
+    arguments = [argv[0]]
+    options = {}
+    index = 1
+    while index < len(argv):
+        argument = argv[index]
+        if argument.startswith("--"):
+            name, hasValue, value = argument.partition("=")
+            if name in valueOptions and not hasValue:
+                index += 1
+                if index == len(argv):
+                    raise NotEnoughArgummentsError(f"Option {name} needs a value")
+                value = argv[index]
+            options[name] = value
         else:
-            allowVerbosity = False # verbosity disabled by default
-        if len(sys.argv) >= 5:
-            if (sys.argv[4]).upper() == "SPACE":
+            arguments.append(argument)
+        index += 1
+    return arguments, options
+
+def main():
+    # support for IDE running script
+    # easily modifiable to make more modular -
+    # currently we are using two subfolders to be more organised - one with all the .PDA files
+    # and one with all of the input files to feed into the PDA
+    PDADefinitionFolder = "PDA Definition Files"
+    inputFolder = "Input Files"
+    arguments, options = splitOptions(sys.argv)
+    batchMode = "--batch" in options
+    streamMode = "--stream" in options
+    nondeterministicMode = "--nondeterministic" in options
+    grammarMode = "--grammar" in options
+    useCache = "--no-cache" not in options # parsed PDAs are cached next to their .pda file (see PDACache.py)
+    tracePath = options.get("--trace") # trace file of the run, relative to the folder the script was started in
+    traceCapacity = options.get("--trace-capacity")
+    profileMode = "--profile" in options
+    optimizeMode = "--optimize" in options
+    checkDeterminism = "--check-determinism" in options
+    vectorizedMode = "--vectorized" in options
+    compactStack = "--compact-stack" in options
+    maximumStackDepth = options.get("--max-stack-depth")
+    jobs = int(options.get("--jobs", 1)) # worker processes used for batch runs
+    chunkSize = int(options.get("--chunk-size", 256)) # input strings sent to a worker at a time
+    batchInputs = None
+    if len(arguments) == 1:
+        try:
+            changeDirectory(PDADefinitionFolder)
+            inputPDAFile = open(input("Give PDA Definition file name: "), "r")
+            PDAPath = os.path.abspath(inputPDAFile.name) # the cache is found from the path, after leaving the folder
+            os.chdir("..")
+            changeDirectory(inputFolder)
+            inputStringFile = open(input("Give input file name: "), "r")
+            os.chdir("..")
+            allowVerbosity = bool(int(input("Want to output all steps taken by the PDA? (Input 1/0) ")))
+            stringInput = input("What separator is used between the symbols in the input file? (Space -> ' ', NoSeparator -> '', ; -> ';', etc.) ")
+            if stringInput.upper() == "SPACE":
                 stringSeparator = " "
-            elif (sys.argv[4]).upper() == "NOSEPARATOR":
+            elif stringInput.upper() == "NOSEPARATOR":
                 stringSeparator = ""
             else:
-                stringSeparator = sys.argv[4] 
+                stringSeparator = stringInput
+        except FileNotFoundError:
+            raise PDAFileNotFoundError(f"PDA file not found in directory {os.getcwd()}") 
+
+    # support for CLI running script
+    #         
+    elif len(arguments) == 2:
+        raise NotEnoughArgummentsError("You need to also give input file name as an argument, and optionally if you want to output all steps taken by the PDA (1/0 as third argument) ")
+
+    else:     
+        try:
+            changeDirectory(PDADefinitionFolder)
+            inputPDAFile = open(arguments[1], "r")
+            PDAPath = os.path.abspath(inputPDAFile.name) # the cache is found from the path, after leaving the folder
+            os.chdir("..")
+            changeDirectory(inputFolder)
+            if batchMode or os.path.isdir(arguments[2]):
+                batchInputs = readBatchInputs(arguments[2])
+            elif streamMode and arguments[2] == "-":
+                inputStringFile = sys.stdin
+            else:
+                inputStringFile = open(arguments[2], "r")
+            os.chdir("..")
+            if len(arguments) >= 4: 
+                allowVerbosity = bool(int(arguments[3])) # 1 or 0 if i want all intermediate steps printed to the output or not
+            else:
+                allowVerbosity = False # verbosity disabled by default
+            if len(arguments) >= 5:
+                if (arguments[4]).upper() == "SPACE":
+                    stringSeparator = " "
+                elif (arguments[4]).upper() == "NOSEPARATOR":
+                    stringSeparator = ""
+                else:
+                    stringSeparator = arguments[4] 
+            else:
+                stringSeparator = ""
+        except FileNotFoundError:
+            raise PDAFileNotFoundError(f"PDA input file not found in directory {os.getcwd()}") 
+
+
+    if grammarMode:
+        # membership is decided by the Earley recognizer, in polynomial time for any grammar
+        recognizer = grammars.EarleyRecognizer(grammars.parseGrammarFile(inputPDAFile))
+        if batchInputs is None:
+            accepted = grammars.runGrammar(recognizer, inputStringFile.read(), stringSeparator)
+            inputStringFile.close()
+            print("Accepted" if accepted else "Rejected")
         else:
-            stringSeparator = ""
-    except FileNotFoundError:
-        raise PDAFileNotFoundError(f"PDA input file not found in directory {os.getcwd()}") 
-    
-    
-pda = automaton.parseFile(inputPDAFile)
-inputPDAFile.close()
-# automaton.printPDADataStructures(PDA)
-# print()
-inputString = inputStringFile.read()
-inputStringFile.close()
-
-if automaton.runPDA(pda, inputString, stringSeparator, allowVerbosity) == True:
-    print("Accepted")
-else:
-    print("Rejected")
\ No newline at end of file
+            for label, inputString in batchInputs:
+                accepted = grammars.runGrammar(recognizer, inputString, stringSeparator)
+                print(f"{label}: {'Accepted' if accepted else 'Rejected'}")
+        return
+
+    inputPDAFile.close()
+    pda = cache.loadPDA(PDAPath, useCache) # parsed, validated and compiled once per version of the file
+    # automaton.printPDADataStructures(PDA)
+    # print()
+    if checkDeterminism:
+        print(automaton.describeConflicts(automaton.findConflicts(pda)))
+        print()
+    if nondeterministicMode:
+        # every rule is kept, including alternatives for the same state, symbol and pop symbol
+        machine = nondeterministic.compileNPDA(pda)
+        if batchInputs is None:
+            accepted = nondeterministic.runNPDA(machine, inputStringFile.read(), stringSeparator, allowVerbosity)
+            inputStringFile.close()
+            print("Accepted" if accepted else "Rejected")
+        else:
+            for label, inputString in batchInputs:
+                accepted = nondeterministic.runNPDA(machine, inputString, stringSeparator, allowVerbosity)
+                print(f"{label}: {'Accepted' if accepted else 'Rejected'}")
+        return
+
+    if optimizeMode:
+        # after the nondeterministic mode - the optimized PDA drops the alternatives runPDA never takes
+        pda, report = optimizer.optimizePDA(pda)
+        print(report.report())
+        print()
+
+    if profileMode:
+        # instrumented runs on the rules dict, the report adds up every input string
+        stats = profiling.PDAStats(pda)
+        if batchInputs is None:
+            batchInputs = [(None, inputStringFile.read())]
+            inputStringFile.close()
+        for label, inputString in batchInputs:
+            accepted = profiling.profilePDA(pda, inputString, stringSeparator, stats).lastAccepted
+            result = "Accepted" if accepted else "Rejected"
+            print(result if label is None else f"{label}: {result}")
+        print()
+        print(stats.report())
+        return
+
+    pda = automaton.compilePDA(pda) # integer-coded tables, runPDA takes its fast path on them
+    if batchInputs is not None:
+        # the PDA was parsed and compiled once above, every input string reuses it
+        labels = [label for label, inputString in batchInputs]
+        inputStrings = [inputString for label, inputString in batchInputs]
+        if vectorizedMode:
+            results = vectorized.runPDAVectorized(pda, inputStrings, stringSeparator).tolist()
+        elif jobs > 1:
+            results = automaton.runPDAParallel(pda, inputStrings, stringSeparator, jobs, chunkSize)
+        else:
+            results = automaton.runPDABatch(pda, inputStrings, stringSeparator, allowVerbosity)
+        for label, accepted in zip(labels, results):
+            print(f"{label}: {'Accepted' if accepted else 'Rejected'}")
+        return
+
+    trace = None
+    if tracePath is not None and traceCapacity is not None:
+        trace = tracing.TraceRecorder(pda, int(traceCapacity)) # ring buffer, saved once the run is over
+    elif tracePath is not None:
+        trace = tracing.TraceRecorder(pda, tracePath = tracePath) # every move is written to the file
+    stack = None # runPDA's own list
+    if compactStack or maximumStackDepth is not None:
+        # the maximum depth is checked by the CompactStack, so it implies one
+        stack = automaton.CompactStack(None if maximumStackDepth is None else int(maximumStackDepth))
+    try:
+        if streamMode:
+            # symbols are read, checked and fed to the PDA one at a time, reading stops early in a dead state
+            accepted = automaton.runPDAStream(pda, inputStringFile, stringSeparator, allowVerbosity, trace = trace, stack = stack)
+            inputStringFile.close()
+            print("Accepted" if accepted else "Rejected")
+        else:
+            inputString = inputStringFile.read()
+            inputStringFile.close()
+
+            if automaton.runPDA(pda, inputString, stringSeparator, allowVerbosity, trace, stack) == True:
+                print("Accepted")
+            else:
+                print("Rejected")
+    finally:
+        # the trace is kept even if the run stopped with an error (e.g. a symbol not in the alphabet)
+        if trace is not None:
+            trace.close()
+            if traceCapacity is not None:
+                trace.save(tracePath)
+
+# the guard keeps worker processes of --jobs (which import this module) from running the script again
+if __name__ == "__main__":
+    main()
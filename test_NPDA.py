@@ -0,0 +1,116 @@
+# checks of the nondeterministic engine against a brute-force search over (state, stack tuple)
+# configurations with the same epsilon growth limit - run with python3 -m pytest
+import PDA as automaton
+import NPDA as nondeterministic
+import random
+import time
+
+def bruteForceClosure(PDA, configurations, epsilonGrowthLimit):
+    # every configuration reachable with epsilon moves from one of configurations, on a path whose stack
+    # stays within epsilonGrowthLimit symbols above the height of the configuration it started from
+    ruleList = automaton.getRuleList(PDA)
+    reached = set()
+    for state, stack in configurations:
+        maximumHeight = len(stack) + epsilonGrowthLimit
+        seen = {(state, stack)}
+        toVisit = [(state, stack)]
+        while toVisit:
+            state, stack = toVisit.pop()
+            for sourceState, symbol, popSymbol, pushSymbol, destinationState in ruleList:
+                if sourceState != state or symbol not in ["epsilon", "ε"]:
+                    continue
+                nextStack = stack
+                if popSymbol not in ["epsilon", "ε"]:
+                    if not stack or stack[-1] != popSymbol:
+                        continue
+                    nextStack = stack[:-1]
+                nextStack += automaton.splitPush(pushSymbol)
+                if len(nextStack) <= maximumHeight and (destinationState, nextStack) not in seen:
+                    seen.add((destinationState, nextStack))
+                    toVisit.append((destinationState, nextStack))
+        reached |= seen
+    return reached
+
+def bruteForceRun(PDA, symbols, epsilonGrowthLimit):
+    states, sigma, stackSigma, rules, start, accept = PDA
+    ruleList = automaton.getRuleList(PDA)
+    configurations = bruteForceClosure(PDA, {(start, ())}, epsilonGrowthLimit)
+    for currentSymbol in symbols:
+        nextConfigurations = set()
+        for state, stack in configurations:
+            for sourceState, symbol, popSymbol, pushSymbol, destinationState in ruleList:
+                if sourceState != state or symbol != currentSymbol:
+                    continue
+                nextStack = stack
+                if popSymbol not in ["epsilon", "ε"]:
+                    if not stack or stack[-1] != popSymbol:
+                        continue
+                    nextStack = stack[:-1]
+                nextConfigurations.add((destinationState, nextStack + automaton.splitPush(pushSymbol)))
+        configurations = bruteForceClosure(PDA, nextConfigurations, epsilonGrowthLimit)
+    return any(state in accept for state, stack in configurations)
+
+def definition(rules, accept, states = ("q0", "q1"), sigma = ("a",), stackSigma = ("$", "A")):
+    ruleDict = {}
+    for sourceState, symbol, popSymbol, pushSymbol, destinationState in rules:
+        ruleDict.setdefault(sourceState, {}).setdefault(symbol, {})[popSymbol] = {"push" : pushSymbol, "nextState" : destinationState}
+    # the rule list keeps the alternatives for the same state, symbol and pop symbol the dict drops
+    PDA = (list(states), list(sigma), list(stackSigma), ruleDict, states[0], list(accept))
+    assert automaton.isPDAValid(PDA, list(rules))
+    return automaton.ValidatedPDA(PDA, list(rules))
+
+def randomDefinition(rng):
+    states = [f"q{index}" for index in range(rng.randint(1, 4))]
+    stackSigma = ["$", "A", "B"][: rng.randint(1, 3)]
+    rules = []
+    for ruleNumber in range(rng.randint(1, 9)):
+        symbol = "epsilon" if rng.random() < 0.5 else rng.choice(["a", "b"])
+        popSymbol = "epsilon" if rng.random() < 0.5 else rng.choice(stackSigma)
+        pushSymbol = " ".join(rng.choice(stackSigma) for push in range(rng.randint(0, 2))) or "epsilon"
+        rules.append((rng.choice(states), symbol, popSymbol, pushSymbol, rng.choice(states)))
+    return definition(rules, rng.sample(states, 1), states, ("a", "b"), stackSigma)
+
+def test_pushOnlyCycleIsFollowed():
+    # the epsilon self loop pushing $ has to be taken at least once for the a to be read
+    PDA = definition([("q0", "epsilon", "epsilon", "$", "q0"), ("q0", "a", "$", "epsilon", "q1")], ["q1"])
+    assert automaton.runPDA(PDA, "a", "", False)
+    assert nondeterministic.runNPDA(PDA, "a", "", False)
+    assert nondeterministic.runNPDA(PDA, "a", "", False, epsilonGrowthLimit = 100)
+
+def test_pushStringWithinDefaultLimit():
+    PDA = definition([("q0", "epsilon", "epsilon", "A A A", "q1"), ("q1", "a", "A", "epsilon", "q1")], ["q1"])
+    for inputString in ["", "a", "aa", "aaa"]:
+        assert nondeterministic.runNPDA(PDA, inputString, "", False)
+    assert not nondeterministic.runNPDA(PDA, "aaaa", "", False)
+
+def test_escapeTheRoom():
+    PDA = automaton.parseFile(open("PDA Definition Files/escapeTheRoom.pda"))
+    for inputFileName in ["gameInput", "gameInputNoSpoon"]:
+        with open("Input Files/" + inputFileName) as inputFile:
+            inputString = inputFile.read()
+        assert nondeterministic.runNPDA(PDA, inputString, " ", False) == automaton.runPDA(PDA, inputString, " ", False)
+
+def test_matchesBruteForce():
+    rng = random.Random(7)
+    for machineNumber in range(1000):
+        PDA = randomDefinition(rng)
+        machine = nondeterministic.compileNPDA(PDA)
+        for inputNumber in range(5):
+            symbols = [rng.choice("ab") for symbol in range(rng.randint(0, 3))]
+            epsilonGrowthLimit = rng.randint(0, 2)
+            expected = bruteForceRun(PDA, symbols, epsilonGrowthLimit)
+            assert nondeterministic.runNPDA(machine, "".join(symbols), "", False, epsilonGrowthLimit) == expected
+
+def test_epsilonDiamondsArePolynomial():
+    # 40 epsilon diamonds in a row - 2^40 paths through them, but only 121 configurations
+    rules = []
+    for diamond in range(40):
+        rules += [(f"d{diamond}", "epsilon", "epsilon", "epsilon", f"l{diamond}"),
+                  (f"d{diamond}", "epsilon", "epsilon", "epsilon", f"r{diamond}"),
+                  (f"l{diamond}", "epsilon", "epsilon", "epsilon", f"d{diamond + 1}"),
+                  (f"r{diamond}", "epsilon", "epsilon", "epsilon", f"d{diamond + 1}")]
+    states = ["d0"] + [f"{kind}{diamond}" for diamond in range(40) for kind in "lr"] + [f"d{diamond}" for diamond in range(1, 41)]
+    PDA = definition(rules, ["d40"], states)
+    startTime = time.perf_counter()
+    assert nondeterministic.runNPDA(PDA, "", "", False)
+    assert time.perf_counter() - startTime < 1
@@ -0,0 +1,29 @@
+# checks of the ring buffer of TraceRecorder - run with python3 -m pytest
+import PDA as automaton
+import PDATrace as tracing
+
+def recordedEvents(capacity, inputString = "0011"):
+    # the events kept by a TraceRecorder of the given capacity on a run of notregular.pda
+    compiledPDA = automaton.compilePDA(automaton.parseFile(open("PDA Definition Files/notregular.pda")))
+    trace = tracing.TraceRecorder(compiledPDA, capacity)
+    automaton.runPDA(compiledPDA, inputString, "", False, trace)
+    events = trace.eventList()
+    return trace, [tuple(events[position:position + tracing.EVENT_FIELDS]) for position in range(0, len(events), tracing.EVENT_FIELDS)]
+
+def test_ringBufferKeepsTheLastEvents():
+    trace, allEvents = recordedEvents(1000)
+    assert trace.droppedEvents == 0
+    assert allEvents[-1][0] == tracing.RESULT_STEP
+    for capacity in range(1, len(allEvents) + 2):
+        trace, events = recordedEvents(capacity)
+        # exactly capacity events recorded is the case where the buffer has just wrapped around
+        assert events == allEvents[-capacity:]
+        assert trace.droppedEvents == max(0, len(allEvents) - capacity)
+
+def test_savedTraceAtExactCapacity(tmp_path):
+    trace, allEvents = recordedEvents(1000)
+    trace, events = recordedEvents(len(allEvents))
+    trace.save(tmp_path / "run.pdat")
+    header, savedEvents = tracing.readTrace(tmp_path / "run.pdat")
+    assert header["droppedEvents"] == 0
+    assert savedEvents == allEvents
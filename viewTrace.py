@@ -0,0 +1,75 @@
+import PDA as automaton
+import PDATrace as tracing
+import emulatePDA
+import json
+import sys
+
+# python3 viewTrace.py traceFile OPTIONAL(--json)
+#                                           --json - one JSON object per event (JSON lines) instead of text
+# renders a trace file written by a TraceRecorder (see PDATrace.py, or emulatePDA.py --trace)
+# the stack after every move is shown when the trace has every event of the run (nothing was dropped
+# from the ring buffer) - the stack before the first event kept is unknown otherwise
+class NotEnoughArgummentsError(Exception):
+    pass
+
+def symbolName(names, code):
+    return "epsilon" if code == automaton.NO_RULE else names[code]
+
+def describeEvent(header, event):
+    # the event as a dict of names
+    step, symbol, fromState, toState, popSymbol, pushSymbol = event
+    states = header["states"]
+    if step == tracing.RESULT_STEP:
+        return {"result" : "Accepted" if symbol else "Rejected", "state" : states[toState]}
+    stackSymbols = header["stackSymbols"]
+    return {
+        "step" : step,
+        "symbol" : header["symbols"][symbol],
+        "from" : states[fromState],
+        "to" : states[toState],
+        "pop" : symbolName(stackSymbols, popSymbol),
+        "push" : symbolName(stackSymbols, pushSymbol)
+    }
+
+def renderText(header, events):
+    stackSymbols = header["stackSymbols"]
+    stack = [] if header["droppedEvents"] == 0 else None
+    print(f"# {len(events)} events, {header['droppedEvents']} older events dropped")
+    for event in events:
+        description = describeEvent(header, event)
+        if "result" in description:
+            print(f"{description['result']} in state {description['state']}")
+            continue
+        step, symbol, fromState, toState, popSymbol, pushSymbol = event
+        operation = []
+        if popSymbol != automaton.NO_RULE:
+            operation.append(f"pop {description['pop']}")
+        if pushSymbol != automaton.NO_RULE:
+            operation.append(f"push {description['push']}")
+        if not operation and fromState == toState and symbol != len(header["symbols"]) - 1:
+            operation.append("no rule, stays") # the implicit self loop of getNextState
+        line = f"{step:>8}  {description['symbol']:<10} {description['from']} -> {description['to']:<12} {', '.join(operation):<24}"
+        if stack is not None:
+            if popSymbol != automaton.NO_RULE:
+                stack.pop()
+            if pushSymbol != automaton.NO_RULE:
+                stack.append(stackSymbols[pushSymbol])
+            line += " stack: " + " ".join(stack)
+        print(line.rstrip())
+
+def renderJSON(header, events):
+    for event in events:
+        print(json.dumps(describeEvent(header, event), ensure_ascii = False))
+
+def main():
+    arguments, options = emulatePDA.splitOptions(sys.argv, [])
+    if len(arguments) < 2:
+        raise NotEnoughArgummentsError("You need to give the trace file name as an argument")
+    header, events = tracing.readTrace(arguments[1])
+    if "--json" in options:
+        renderJSON(header, events)
+    else:
+        renderText(header, events)
+
+if __name__ == "__main__":
+    main()